@@ -1,39 +1,6 @@
 #!/usr/bin/env python3
-from setuptools import setup, find_packages
+# Metadata lives in pyproject.toml; this shim only keeps legacy
+# `python setup.py ...` invocations working.
+from setuptools import setup
 
-with open("requirements.txt", "r") as f:
-    requirements = [line.strip() for line in f if line.strip() and not line.startswith("#")]
-
-try:
-    with open("README.md", "r", encoding="utf-8") as f:
-        long_description = f.read()
-except FileNotFoundError:
-    long_description = "Simpl-CLI: A simple wrapp CLI Awokwokwk"
-
-setup(
-    name="simpl-cli",
-    version="0.0.0.1",
-    author="diter89",
-    author_email="",
-    description="A simple wrapp CLI Awwokwokw ",
-    long_description=long_description,
-    long_description_content_type="text/markdown",
-    packages=find_packages(),
-    python_requires=">=3.8",
-    install_requires=requirements,
-    entry_points={
-        "console_scripts": [
-            "simpl-cli=simpl_cli.cli:main",
-            "simpl=simpl_cli.cli:main", 
-        ],
-    },
-    classifiers=[
-        "Development Status :: 3 - Alpha",
-        "Intended Audience :: Developers",
-        "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
-        "Programming Language :: Python :: 3.10", 
-        "Programming Language :: Python :: 3.11",
-    ],
-)
+setup()
@@ -0,0 +1,4 @@
+#!/usr/bin/env python3
+from .cli import main
+
+raise SystemExit(main())
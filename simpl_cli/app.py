@@ -1,18 +1,23 @@
 #!/usr/bin/env python3
 import os
+import re
+import asyncio
 import sys
 import json
+import time
+import shlex
 import subprocess
-import requests
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 from prompt_toolkit import PromptSession
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
 from prompt_toolkit.clipboard.pyperclip import PyperclipClipboard
 from rich.console import Console
-from rich.live import Live
 from rich.table import Table
 from rich.panel import Panel
-from rich.columns import Columns
 
 from .config import Config
 from .customization import (
@@ -22,7 +27,72 @@ from .customization import (
     ContextManager
 )
 from .completion import create_completion_manager
-from .environment import env_detector
+from .environment import env_detector, invalidate_env_cache
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+# Fast path for the fixed SSE chunk shape: pull the delta's "content" string directly
+_SSE_CONTENT_RE = re.compile(rb'"content"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+_ENV_LINE_RE = re.compile(r'^(?!_=|PS[12]=|BASH_FUNC_)([A-Za-z_][A-Za-z0-9_]*)=(.*)$', re.MULTILINE)
+
+# Builtins or operators that plain `sh -c` would not handle the way bash does
+_NEEDS_BASH_RE = re.compile(
+    r'^\s*(?:source|(?:export|unset|alias|unalias|declare|typeset|readonly)(?:\s|$))'
+    r'|source |export |unset |&&|\|\||;'
+)
+
+# Anything a shell would expand, redirect or interpret; otherwise argv is enough
+_SHELL_META_RE = re.compile(r'[|&;<>()$`\\"\'*?\[\]#~=%{}!\n]')
+
+
+_PIPE_SIZE = 1 << 20
+
+# Commands that can change the cwd listing the completer has cached
+_MODIFY_COMMANDS = frozenset({'touch', 'mkdir', 'rm', 'rmdir', 'mv', 'cp', 'ln'})
+
+
+def _base_command(command: str) -> str:
+    # maxsplit stops after the first word; any whitespace (tabs too) ends it
+    parts = command.split(None, 1)
+    return parts[0] if parts else ''
+
+
+def _enlarge_pipe(pipe):
+    # Bigger kernel pipe buffers mean fewer wakeups/reads for commands with large output (Linux only)
+    set_pipe_size = getattr(fcntl, 'F_SETPIPE_SZ', None)
+    if set_pipe_size is None or pipe is None:
+        return
+    try:
+        fcntl.fcntl(pipe.fileno(), set_pipe_size, _PIPE_SIZE)
+    except OSError:
+        pass
+
+
+def _run_captured(args, shell: bool = False) -> subprocess.CompletedProcess:
+    with subprocess.Popen(
+        args,
+        shell=shell,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=os.getcwd()
+    ) as process:
+        _enlarge_pipe(process.stdout)
+        _enlarge_pipe(process.stderr)
+        try:
+            stdout, stderr = process.communicate()
+        except:
+            process.kill()
+            raise
+    
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
 
 
 class HybridShell:
@@ -30,13 +100,33 @@ class HybridShell:
         self.api_key = api_key
         self.mode = "shell"  # "shell" or "ai"
         self.session = PromptSession()
+        self.http = None  # requests.Session, created on first AI request
+        self.api_headers = {
+            "Accept": "text/event-stream",
+            "Content-Type": "application/json", 
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        self.api_base_payload = {
+            "model": Config.get_model_name(),
+            "stream": True,
+            **Config.AI_CONFIG
+        }
         self.console = Console()
         
         self.ui = UIManager(self.console)
         self.streaming_ui = StreamingUIManager(self.console)
         self.context_manager = ContextManager()
         
-        self.completion_manager = create_completion_manager()
+        self.completion_manager = create_completion_manager(str(Config.COMPLETION_CACHE_FILE))
+        self._cache_refresh_handle = None
+        
+        self._ai_commands = {
+            "clear0": self._ai_clear_conversation,
+            "clear": self._ai_clear_all,
+            "context": self._ai_show_context,
+            "resume": self.resume_cancelled_stream,
+            "cancelstate": self._ai_show_cancel_state,
+        }
         
         self.setup_keybindings()
         
@@ -67,43 +157,47 @@ class HybridShell:
         @self.bindings.add('escape', 'r') 
         def refresh_completion(event):
             self.completion_manager.clear_cache()
+            self._schedule_completion_refresh()
             
         @self.bindings.add('escape', 'z') 
         def resume_cancelled_stream(event):
             self.resume_cancelled_stream()
 
+    def _schedule_completion_refresh(self, delay: float = 0.1):
+        if self._cache_refresh_handle is not None:
+            self._cache_refresh_handle.cancel()
+            self._cache_refresh_handle = None
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.completion_manager.apply_pending_refresh()
+            return
+        
+        self._cache_refresh_handle = loop.call_later(delay, self.completion_manager.apply_pending_refresh)
+
     def true_clear_terminal(self):
-        clear_sequence = '\033[2J\033[H'
+        # Clear screen and scrollback, then home the cursor
+        clear_sequence = '\033[2J\033[3J\033[H'
         sys.stdout.write(clear_sequence)
         sys.stdout.flush()
-        
-        try:
-            if os.name == 'posix':
-                os.system('clear')
-            elif os.name == 'nt':
-                os.system('cls')
-        except:
-            self.console.clear()
 
     def is_interactive_command(self, command: str) -> bool:
-        base_cmd = command.strip().split()[0]
-        
-        if base_cmd in Config.INTERACTIVE_COMMANDS:
+        if _base_command(command) in Config.INTERACTIVE_COMMANDS:
             return True
             
-        if '|' in command:
-            parts = command.split('|')
-            for part in parts:
-                if part.strip().split()[0] in Config.INTERACTIVE_COMMANDS:
-                    return True
+        if '|' not in command:
+            return False
         
-        return False
+        return any(_base_command(part) in Config.INTERACTIVE_COMMANDS for part in command.split('|')[1:])
 
     def handle_environment_commands(self, command: str) -> bool:
         if not command.startswith('!'):
             return False
             
         env_cmd = command[1:]
+        # Env info is cached for a few seconds per cwd; an explicit request should be current
+        invalidate_env_cache()
         
         try:
             if env_cmd == "env":
@@ -192,8 +286,10 @@ class HybridShell:
         self.console.print(table)
 
     def _show_detailed_system_info(self):
-        system_info = env_detector.get_system_info()
+        from rich.columns import Columns
+        
         env_info = env_detector.get_all_environments()
+        system_info = env_info['system']
         
         system_text = f"""[bold cyan]System Resources[/bold cyan]
 CPU Usage: {system_info['cpu_percent']:.1f}%
@@ -284,23 +380,27 @@ Uptime: {system_info['uptime']}"""
         self.console.print(table)
         
         try:
-            result = subprocess.run([sys.executable, '-m', 'pip', 'list'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')[2:]
-                if lines:
-                    packages = '\n'.join(lines[:10])
-                    if len(lines) > 10:
-                        packages += f"\n... and {len(lines) - 10} more packages"
-                    self.console.print(Panel(packages, title="Installed Packages (Top 10)", border_style="blue"))
+            from importlib.metadata import distributions
+            
+            installed = {}
+            for dist in distributions():
+                name = dist.metadata['Name']
+                if name:
+                    installed.setdefault(name, dist.version)
+            
+            names = sorted(installed, key=str.lower)
+            if names:
+                width = max(len(name) for name in names[:10])
+                packages = '\n'.join(f"{name.ljust(width)} {installed[name]}" for name in names[:10])
+                if len(names) > 10:
+                    packages += f"\n... and {len(names) - 10} more packages"
+                self.console.print(Panel(packages, title="Installed Packages (Top 10)", border_style="blue"))
         except:
             pass
 
     def _execute_source_like_command(self, original_command: str, bash_command: str):
         """Execute a source-like command and update environment"""
         try:
-            old_env = dict(os.environ)
-            
             with self.ui.create_status(f"Executing: {original_command}"):
                 result = subprocess.run(
                     ['bash', '-c', bash_command],
@@ -313,21 +413,20 @@ Uptime: {system_info['uptime']}"""
                 new_vars = {}
                 changed_vars = {}
                 
-                for line in result.stdout.split('\n'):
-                    if '=' in line and not line.startswith('_='):
-                        try:
-                            key, value = line.split('=', 1)
-                            if key in ['PS1', 'PS2', 'BASH_FUNC_*', '_'] or key.startswith('BASH_FUNC_'):
-                                continue
-                                
-                            if key not in old_env:
-                                new_vars[key] = value
-                            elif old_env[key] != value:
-                                changed_vars[key] = {'old': old_env[key], 'new': value}
-                                
-                            os.environ[key] = value
-                        except ValueError:
-                            continue
+                for match in _ENV_LINE_RE.finditer(result.stdout):
+                    key, value = match.group(1), match.group(2)
+                    previous = os.environ.get(key)
+                    
+                    if previous is None:
+                        new_vars[key] = value
+                    elif previous != value:
+                        changed_vars[key] = {'old': previous, 'new': value}
+                    else:
+                        continue
+                        
+                    os.environ[key] = value
+                
+                invalidate_env_cache()
                 
                 success_msg = f"✅ {original_command} completed successfully"
                 if new_vars or changed_vars:
@@ -349,23 +448,24 @@ Uptime: {system_info['uptime']}"""
 
     def _show_env_changes(self, new_vars: dict, changed_vars: dict):
         important_vars = ['PATH', 'VIRTUAL_ENV', 'CONDA_DEFAULT_ENV', 'NODE_ENV', 'PYTHONPATH', 'LD_LIBRARY_PATH', 'JAVA_HOME']
+        lines = []
         
         if new_vars:
-            self.console.print("[dim]New environment variables:[/dim]")
+            lines.append("[dim]New environment variables:[/dim]")
             count = 0
             for var, value in new_vars.items():
                 if var in important_vars or count < 5: 
                     display_value = value
                     if len(display_value) > 60:
                         display_value = display_value[:57] + "..."
-                    self.console.print(f"[dim green]  +{var}={display_value}[/dim green]")
+                    lines.append(f"[dim green]  +{var}={display_value}[/dim green]")
                     count += 1
             
             if len(new_vars) > count:
-                self.console.print(f"[dim]  ... and {len(new_vars) - count} more new variables[/dim]")
+                lines.append(f"[dim]  ... and {len(new_vars) - count} more new variables[/dim]")
         
         if changed_vars:
-            self.console.print("[dim]Changed environment variables:[/dim]")
+            lines.append("[dim]Changed environment variables:[/dim]")
             count = 0
             for var, values in changed_vars.items():
                 if var in important_vars or count < 3:
@@ -377,11 +477,14 @@ Uptime: {system_info['uptime']}"""
                     if len(new_val) > 30:
                         new_val = new_val[:27] + "..."
                         
-                    self.console.print(f"[dim yellow]  ~{var}: {old_val} → {new_val}[/dim yellow]")
+                    lines.append(f"[dim yellow]  ~{var}: {old_val} → {new_val}[/dim yellow]")
                     count += 1
             
             if len(changed_vars) > count:
-                self.console.print(f"[dim]  ... and {len(changed_vars) - count} more changed variables[/dim]")
+                lines.append(f"[dim]  ... and {len(changed_vars) - count} more changed variables[/dim]")
+        
+        if lines:
+            self.console.print("\n".join(lines))
 
     def execute_shell_command(self, command: str):
         if not command.strip():
@@ -399,6 +502,7 @@ Uptime: {system_info['uptime']}"""
             elif command.strip().startswith("cd "):
                 result = self._handle_cd_command(command)
                 self.completion_manager.update_cache()
+                self.completion_manager.warmup()
                 return result
             
             elif command.strip().startswith("source "):
@@ -512,6 +616,8 @@ Uptime: {system_info['uptime']}"""
                         if conda_base_bin not in current_path:
                             os.environ['PATH'] = f"{conda_base_bin}{os.pathsep}{current_path}"
             
+            invalidate_env_cache()
+            
             success_msg = f"✅ Deactivated {env_type} environment: {env_name}"
             self.console.print(f"[green]{success_msg}[/green]")
             self.context_manager.add_shell_context(command, success_msg)
@@ -573,6 +679,7 @@ Uptime: {system_info['uptime']}"""
         
         try:
             os.chdir(path)
+            invalidate_env_cache()
             new_dir = os.getcwd()
             self.ui.display_directory_change(command, new_dir)
             self.context_manager.add_shell_context(command, f"Changed directory to: {new_dir}")
@@ -601,39 +708,12 @@ Uptime: {system_info['uptime']}"""
             self.context_manager.add_shell_context(command, error_msg)
 
     def _handle_regular_command(self, command: str):
-        bash_builtins = ['source', 'export', 'unset', 'alias', 'unalias', 'declare', 'typeset', 'readonly']
-        command_parts = command.strip().split()
-        base_command = command_parts[0] if command_parts else ""
-        
-        needs_bash = (
-            'source ' in command or 
-            command.strip().startswith('source') or
-            base_command in bash_builtins or
-            '&&' in command or 
-            '||' in command or
-            ';' in command or
-            'export ' in command or
-            'unset ' in command
-        )
-        
-        if needs_bash:
+        if _NEEDS_BASH_RE.search(command):
             with self.ui.create_status(f"Executing: {command}"):
-                result = subprocess.run(
-                    ['bash', '-c', command],
-                    capture_output=True, 
-                    text=True,
-                    cwd=os.getcwd(),
-                    env=os.environ.copy()
-                )
+                result = _run_captured(['bash', '-c', command])
         else:
             with self.ui.create_status(f"Executing: {command}"):
-                result = subprocess.run(
-                    command, 
-                    shell=True, 
-                    capture_output=True, 
-                    text=True,
-                    cwd=os.getcwd()
-                )
+                result = self._run_simple_command(command)
         
         self.ui.display_shell_output(command, result)
         
@@ -642,81 +722,90 @@ Uptime: {system_info['uptime']}"""
         
         self._update_completion_if_needed(command)
 
+    def _run_simple_command(self, command: str):
+        if not _SHELL_META_RE.search(command):
+            try:
+                return _run_captured(shlex.split(command))
+            except (OSError, ValueError):
+                # Builtins, missing or non-executable programs: let the shell report it
+                pass
+        
+        return _run_captured(command, shell=True)
+
     def _update_completion_if_needed(self, command: str):
-        modify_commands = ['touch', 'mkdir', 'rm', 'rmdir', 'mv', 'cp', 'ln']
-        base_cmd = command.strip().split()[0]
+        base_cmd = _base_command(command)
         
-        if base_cmd in modify_commands:
+        if base_cmd in _MODIFY_COMMANDS:
             self.completion_manager.update_cache()
 
     def create_api_streaming_generator(self, messages):
+        if self.http is None:
+            import requests
+            self.http = requests.Session()
+        
         url = Config.API_BASE_URL
-        payload = {
-            "model": Config.get_model_name(),
-            "messages": messages,
-            "stream": True,
-            **Config.AI_CONFIG
-        }
-        headers = {
-            "Accept": "text/event-stream",
-            "Content-Type": "application/json", 
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        payload = {**self.api_base_payload, "messages": messages}
+        
+        # Deltas are coalesced so the renderer redraws once per batch, not per token
+        buffer = []
+        buffered_chars = 0
+        last_flush = time.monotonic()
         
         try:
-            response = requests.post(
+            with self.http.post(
                 url, 
-                headers=headers, 
-                data=json.dumps(payload), 
+                headers=self.api_headers, 
+                data=_json_dumps(payload), 
                 stream=True,
                 timeout=Config.API_TIMEOUT
-            )
-            response.raise_for_status()
+            ) as response:
+                response.raise_for_status()
             
-            for line in response.iter_lines():
-                if line:
-                    line_str = line.decode('utf-8')
-                    
-                    if not line_str.startswith('data: '):
-                        continue
+                for line in response.iter_lines():
+                    if line:
+                        if not line.startswith(b'data: '):
+                            continue
                         
-                    json_str = line_str[6:]
+                        json_bytes = line[6:]
                     
-                    if json_str.strip() == '[DONE]':
-                        break
-                        
-                    try:
-                        chunk_data = json.loads(json_str)
+                        if json_bytes.strip() == b'[DONE]':
+                            break
                         
-                        if 'choices' in chunk_data and len(chunk_data['choices']) > 0:
-                            delta = chunk_data['choices'][0].get('delta', {})
-                            content = delta.get('content', '')
+                        try:
+                            match = _SSE_CONTENT_RE.search(json_bytes)
+                            if match:
+                                content = _json_loads(b'"' + match.group(1) + b'"')
+                            else:
+                                chunk_data = _json_loads(json_bytes)
+                                choices = chunk_data.get('choices')
+                                content = choices[0].get('delta', {}).get('content') if choices else None
                             
                             if content:
-                                yield content
+                                buffer.append(content)
+                                buffered_chars += len(content)
                                 
-                    except json.JSONDecodeError:
-                        continue
+                                now = time.monotonic()
+                                if (buffered_chars >= Config.STREAM_FLUSH_CHARS or
+                                        '\n' in content or
+                                        now - last_flush >= Config.STREAM_FLUSH_INTERVAL):
+                                    yield ''.join(buffer)
+                                    buffer.clear()
+                                    buffered_chars = 0
+                                    last_flush = now
+                                
+                        except json.JSONDecodeError:
+                            continue
+            
+            if buffer:
+                yield ''.join(buffer)
                         
         except Exception as e:
+            if buffer:
+                yield ''.join(buffer)
             yield f"Error: {str(e)}"
 
     def stream_ai_response(self, user_message: str):
-        messages = []
-        
-        context = self.context_manager.build_context_for_ai()
-        if context:
-            messages.append({
-                "role": "system",
-                "content": f"You are a helpful AI assistant integrated with a shell environment. {context}\n\nUse this context to provide relevant answers about files, directories, or commands the user has executed."
-            })
-        
-        messages.extend(self.context_manager.conversation_history)
-        
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
+        messages = self.context_manager.build_ai_messages(user_message)
         
         def api_streaming_func():
             return self.create_api_streaming_generator(messages)
@@ -776,32 +865,33 @@ Uptime: {system_info['uptime']}"""
 
     def handle_ai_special_commands(self, user_input: str) -> bool:
         """Handle special AI mode commands. Returns True if handled."""
-        if user_input.lower() == "clear0":
-            self.context_manager.clear_conversation()
-            self.ui.show_conversation_cleared()
-            return True
-        elif user_input.lower() == "clear":
-            self.context_manager.clear_all()
-            self.ui.show_context_cleared()
-            return True
-        elif user_input.lower() == "context":
-            self.ui.show_context_table(self.context_manager.shell_context)
-            return True
-        elif user_input.lower() == "resume":
-            self.resume_cancelled_stream()
-            return True
-        elif user_input.lower() == "cancelstate":
-            if self.streaming_ui.has_cancelled_stream():
-                state_info = self.streaming_ui.get_cancelled_state_info()
-                self.ui.show_cancelled_stream_info(state_info)
-            else:
-                self.console.print(Panel(
-                    "[yellow]No cancelled stream available[/yellow]",
-                    title="Cancel State",
-                    border_style="yellow"
-                ))
-            return True
-        return False
+        handler = self._ai_commands.get(user_input.lower())
+        if handler is None:
+            return False
+        handler()
+        return True
+
+    def _ai_clear_conversation(self):
+        self.context_manager.clear_conversation()
+        self.ui.show_conversation_cleared()
+
+    def _ai_clear_all(self):
+        self.context_manager.clear_all()
+        self.ui.show_context_cleared()
+
+    def _ai_show_context(self):
+        self.ui.show_context_table(self.context_manager.shell_context)
+
+    def _ai_show_cancel_state(self):
+        if self.streaming_ui.has_cancelled_stream():
+            state_info = self.streaming_ui.get_cancelled_state_info()
+            self.ui.show_cancelled_stream_info(state_info)
+        else:
+            self.console.print(Panel(
+                "[yellow]No cancelled stream available[/yellow]",
+                title="Cancel State",
+                border_style="yellow"
+            ))
 
     def handle_shell_special_commands(self, user_input: str) -> bool:
         return False
@@ -809,7 +899,14 @@ Uptime: {system_info['uptime']}"""
     def run(self):
         self.ui.show_welcome()
 
-        session_history = AutoSuggestFromHistory()
+        # Only the message and completer change between prompts
+        prompt_kwargs = {
+            'key_bindings': self.bindings,
+            'style': self.ui.get_style(),
+            'auto_suggest': AutoSuggestFromHistory(),
+            'clipboard': PyperclipClipboard(),
+            'complete_while_typing': True,
+        }
         
         try:
             while True:
@@ -820,12 +917,8 @@ Uptime: {system_info['uptime']}"""
                     
                     user_input = self.session.prompt(
                         self.ui.get_prompt_text(self.mode),
-                        key_bindings=self.bindings,
-                        style=self.ui.get_style(),
-                        auto_suggest=session_history,
-                        clipboard=PyperclipClipboard(),
                         completer=current_completer,
-                        complete_while_typing=True,
+                        **prompt_kwargs,
                     ).strip()
                     
                     if not user_input:
@@ -854,22 +947,20 @@ Uptime: {system_info['uptime']}"""
             self.ui.display_goodbye()
         finally:
             self.context_manager.save_history()
+            self.completion_manager.save_cache()
 
 
 def check_dependencies():
-    try:
-        import rich
-        import prompt_toolkit
-        import requests
-        import psutil
-    except ImportError as e:
-        print(f"❌ Required dependency not found: {e}")
+    from importlib.util import find_spec
+    
+    # find_spec only locates the packages; requests is imported on first AI request
+    missing = [name for name in ('rich', 'prompt_toolkit', 'requests', 'psutil') if find_spec(name) is None]
+    if missing:
+        print(f"❌ Required dependency not found: No module named '{missing[0]}'")
         print("Please install required packages:")
         print("pip install rich prompt-toolkit requests psutil")
         
-        try:
-            import tomli
-        except ImportError:
+        if find_spec('tomli') is None:
             print("Optional: pip install tomli (for Poetry project detection)")
         
         sys.exit(1)
@@ -1,124 +1,174 @@
 #!/usr/bin/env python3
 import os
 import glob
+import json
 import stat
 import pwd
 import grp
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Set, Optional, Tuple
+from functools import partial
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Callable, List, Dict, Set, Optional, Tuple
 from prompt_toolkit.completion import FuzzyWordCompleter, Completer, Completion
 from prompt_toolkit.document import Document
 
 
+_FILE_TYPES = MappingProxyType({
+    '.py': '🐍 Python',
+    '.js': '🟨 JavaScript',
+    '.ts': '🔷 TypeScript',
+    '.html': '🌐 HTML',
+    '.css': '🎨 CSS',
+    '.json': '📋 JSON',
+    '.xml': '📄 XML',
+    '.yaml': '⚙️ YAML',
+    '.yml': '⚙️ YAML',
+    '.md': '📝 Markdown',
+    '.txt': '📄 Text',
+    '.log': '📜 Log',
+    '.conf': '⚙️ Config',
+    '.cfg': '⚙️ Config',
+    '.ini': '⚙️ Config',
+    '.sh': '📜 Shell Script',
+    '.bash': '📜 Bash Script',
+    '.zsh': '📜 Zsh Script',
+    '.fish': '🐟 Fish Script',
+    '.jpg': '🖼️ JPEG Image',
+    '.jpeg': '🖼️ JPEG Image',
+    '.png': '🖼️ PNG Image',
+    '.gif': '🖼️ GIF Image',
+    '.svg': '🖼️ SVG Image',
+    '.pdf': '📕 PDF',
+    '.doc': '📄 Word Doc',
+    '.docx': '📄 Word Doc',
+    '.xls': '📊 Excel',
+    '.xlsx': '📊 Excel',
+    '.zip': '🗜️ ZIP Archive',
+    '.tar': '🗜️ TAR Archive',
+    '.gz': '🗜️ GZip Archive',
+    '.rar': '🗜️ RAR Archive',
+    '.7z': '🗜️ 7Z Archive',
+    '.mp3': '🎵 MP3 Audio',
+    '.mp4': '🎬 MP4 Video',
+    '.avi': '🎬 AVI Video',
+    '.mov': '🎬 MOV Video',
+    '.wav': '🎵 WAV Audio',
+    '.flac': '🎵 FLAC Audio',
+})
+
+_SIZE_NAMES = ('B', 'KB', 'MB', 'GB', 'TB')
+
+
+def _char_bitmap(text: str) -> int:
+    """Bitmask of the a-z/0-9 characters in text, used to prefilter fuzzy matches"""
+    bits = 0
+    for char in text.lower():
+        if 'a' <= char <= 'z':
+            bits |= 1 << (ord(char) - 97)
+        elif '0' <= char <= '9':
+            bits |= 1 << (ord(char) - 22)
+    return bits
+
+
 class FileMetadata:
     
-    def __init__(self):
-        self._metadata_cache = {}
+    def __init__(self, max_size: int = 4096):
+        self._metadata_cache = OrderedDict()
+        self._max_size = max_size
+        self._uid_cache = {}
+        self._gid_cache = {}
     
-    def get_file_info(self, file_path: str) -> str:
+    def get_file_info(self, file_path) -> str:
+        """Describe a path or os.DirEntry; a DirEntry reuses its cached file type"""
+        entry = None
+        if isinstance(file_path, os.DirEntry):
+            entry = file_path
+            file_path = entry.path
 
-        if file_path in self._metadata_cache:
-            return self._metadata_cache[file_path]
-        
         try:
+            # Not entry.stat(): that is cached for the life of the scan, and rewriting a
+            # file in place doesn't touch the directory mtime that would renew the scan
             stat_info = os.stat(file_path)
+        except OSError:
+            return "❌ Access denied or file not found"
+        
+        # Keyed by mtime too, so a modified file is re-described instead of served stale
+        cache_key = (file_path, stat_info.st_mtime_ns)
+        meta_info = self._metadata_cache.get(cache_key)
+        if meta_info is not None:
+            self._metadata_cache.move_to_end(cache_key)
+            return meta_info
+        
+        try:
+            mode = stat_info.st_mode
             
-            if os.path.isdir(file_path):
+            if stat.S_ISDIR(mode):
                 file_type = "📁 Directory"
-            elif os.path.islink(file_path):
+            elif entry.is_symlink() if entry is not None else os.path.islink(file_path):
                 file_type = "🔗 Symlink"
-            elif os.access(file_path, os.X_OK):
+            elif mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
                 file_type = "🔧 Executable"
             else:
-                _, ext = os.path.splitext(file_path)
-                file_type = self._get_file_type_by_extension(ext.lower())
+                name = entry.name if entry is not None else os.path.basename(file_path)
+                stem, _, ext = name.rpartition('.')
+                # Same rule as os.path.splitext: leading dots don't start an extension
+                ext = '.' + ext.lower() if stem.lstrip('.') else ''
+                file_type = self._get_file_type_by_extension(ext)
             
             size = stat_info.st_size
             size_str = self._format_size(size)
             
             perms = stat.filemode(stat_info.st_mode)
             
-            try:
-                owner = pwd.getpwuid(stat_info.st_uid).pw_name
-                group = grp.getgrgid(stat_info.st_gid).gr_name
-            except (KeyError, OSError):
-                owner = str(stat_info.st_uid)
-                group = str(stat_info.st_gid)
+            owner = self._uid_cache.get(stat_info.st_uid) or self._resolve_uid(stat_info.st_uid)
+            group = self._gid_cache.get(stat_info.st_gid) or self._resolve_gid(stat_info.st_gid)
             
             mtime = datetime.fromtimestamp(stat_info.st_mtime)
             mtime_str = mtime.strftime("%Y-%m-%d %H:%M")
             
             meta_info = f"{file_type} | {size_str} | {perms} | {owner}:{group} | {mtime_str}"
             
-            self._metadata_cache[file_path] = meta_info
+            self._metadata_cache[cache_key] = meta_info
+            if len(self._metadata_cache) > self._max_size:
+                self._metadata_cache.popitem(last=False)
             return meta_info
             
         except (OSError, PermissionError, FileNotFoundError):
             return "❌ Access denied or file not found"
     
-    def _get_file_type_by_extension(self, ext: str) -> str:
+    def _resolve_uid(self, uid: int) -> str:
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except (KeyError, OSError):
+            name = str(uid)
+        self._uid_cache[uid] = name
+        return name
+    
+    def _resolve_gid(self, gid: int) -> str:
+        try:
+            name = grp.getgrgid(gid).gr_name
+        except (KeyError, OSError):
+            name = str(gid)
+        self._gid_cache[gid] = name
+        return name
+    
+    @staticmethod
+    def _get_file_type_by_extension(ext: str) -> str:
         """Map file extensions to descriptive types with emojis"""
-        type_map = {
-            '.py': '🐍 Python',
-            '.js': '🟨 JavaScript',
-            '.ts': '🔷 TypeScript',
-            '.html': '🌐 HTML',
-            '.css': '🎨 CSS',
-            '.json': '📋 JSON',
-            '.xml': '📄 XML',
-            '.yaml': '⚙️ YAML',
-            '.yml': '⚙️ YAML',
-            '.md': '📝 Markdown',
-            '.txt': '📄 Text',
-            '.log': '📜 Log',
-            '.conf': '⚙️ Config',
-            '.cfg': '⚙️ Config',
-            '.ini': '⚙️ Config',
-            '.sh': '📜 Shell Script',
-            '.bash': '📜 Bash Script',
-            '.zsh': '📜 Zsh Script',
-            '.fish': '🐟 Fish Script',
-            '.jpg': '🖼️ JPEG Image',
-            '.jpeg': '🖼️ JPEG Image',
-            '.png': '🖼️ PNG Image',
-            '.gif': '🖼️ GIF Image',
-            '.svg': '🖼️ SVG Image',
-            '.pdf': '📕 PDF',
-            '.doc': '📄 Word Doc',
-            '.docx': '📄 Word Doc',
-            '.xls': '📊 Excel',
-            '.xlsx': '📊 Excel',
-            '.zip': '🗜️ ZIP Archive',
-            '.tar': '🗜️ TAR Archive',
-            '.gz': '🗜️ GZip Archive',
-            '.rar': '🗜️ RAR Archive',
-            '.7z': '🗜️ 7Z Archive',
-            '.mp3': '🎵 MP3 Audio',
-            '.mp4': '🎬 MP4 Video',
-            '.avi': '🎬 AVI Video',
-            '.mov': '🎬 MOV Video',
-            '.wav': '🎵 WAV Audio',
-            '.flac': '🎵 FLAC Audio',
-        }
-        
-        return type_map.get(ext, '📄 File')
+        return _FILE_TYPES.get(ext, '📄 File')
     
     def _format_size(self, size_bytes: int) -> str:
-        if size_bytes == 0:
-            return "0 B"
-        
-        size_names = ['B', 'KB', 'MB', 'GB', 'TB']
-        i = 0
-        size = float(size_bytes)
+        if size_bytes < 1024:
+            return f"{size_bytes} B"
         
-        while size >= 1024.0 and i < len(size_names) - 1:
-            size /= 1024.0
-            i += 1
-        
-        if i == 0:  # Bytes
-            return f"{int(size)} {size_names[i]}"
-        else:
-            return f"{size:.1f} {size_names[i]}"
+        # floor(log1024(size)) straight from the bit length
+        i = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_NAMES) - 1)
+        return f"{size_bytes / (1 << (10 * i)):.1f} {_SIZE_NAMES[i]}"
     
     def clear_cache(self):
         self._metadata_cache.clear()
@@ -126,72 +176,206 @@ class FileMetadata:
 
 class PathScanner:
     
-    DIR_COMMANDS = {'cd', 'pushd', 'popd', 'rmdir'}
+    DIR_COMMANDS = frozenset({'cd', 'pushd', 'popd', 'rmdir'})
+    
+    FILE_COMMANDS = frozenset({'cat', 'less', 'more', 'head', 'tail', 'vim', 'nano', 'code', 'subl', 'gedit'})
     
-    FILE_COMMANDS = {'cat', 'less', 'more', 'head', 'tail', 'vim', 'nano', 'code', 'subl', 'gedit'}
+    BOTH_COMMANDS = frozenset({'ls', 'll', 'la', 'cp', 'mv', 'rm', 'chmod', 'chown', 'stat', 'file', 'du', 'find'})
     
-    BOTH_COMMANDS = {'ls', 'll', 'la', 'cp', 'mv', 'rm', 'chmod', 'chown', 'stat', 'file', 'du', 'find'}
+    # How long a scan is trusted before the directory mtime is checked again
+    CACHE_TTL = 0.5
+    
+    # Scans kept at once; the least recently refreshed directory is dropped first
+    MAX_CACHED_DIRS = 64
     
     def __init__(self):
-        self._cache = {}
+        self._cache = OrderedDict()
         self._cache_time = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._refreshing = set()
         self.metadata = FileMetadata()
-        
-    def _get_cache_key(self, path: str) -> str:
-        """Generate cache key for a path"""
-        try:
-            mtime = os.path.getmtime(path) if os.path.exists(path) else 0
-            return f"{path}:{mtime}"
-        except OSError:
-            return f"{path}:0"
+        # When set, stale scans are revalidated here while callers get the old result
+        self.executor = None
+    
+    def _get_lock(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(path)
+            if lock is None:
+                lock = self._locks[path] = threading.Lock()
+            return lock
     
-    def _is_cache_valid(self, path: str) -> bool:
-        cache_key = self._get_cache_key(path)
-        return cache_key in self._cache
+    def invalidate(self, path: str = None):
+        """Force the next scan of path (or of every path) to revalidate its mtime"""
+        if path is None:
+            self._cache.clear()
+            self._cache_time.clear()
+            with self._locks_guard:
+                self._locks.clear()
+        else:
+            self._cache_time.pop(path, None)
     
-    def scan_directory(self, path: str = None, include_hidden: bool = False) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    def scan_directory(self, path: str = None, include_hidden: bool = False) -> Tuple[Dict[str, List[str]], Dict[str, Callable[[], str]]]:
 
         if path is None:
             path = os.getcwd()
-            
-        cache_key = self._get_cache_key(path)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
         
+        cached = self._cache.get(path)
+        if cached is not None:
+            if time.monotonic() < self._cache_time.get(path, 0):
+                return cached[1]
+            if self.executor is not None:
+                self.schedule_refresh(path, include_hidden)
+                return cached[1]
+        
+        return self._refresh(path, include_hidden)
+    
+    def schedule_refresh(self, path: str, include_hidden: bool = False):
+        """Revalidate path on the executor unless a refresh is already queued"""
+        with self._locks_guard:
+            if path in self._refreshing:
+                return
+            self._refreshing.add(path)
+        
+        def run():
+            try:
+                self._refresh(path, include_hidden)
+            finally:
+                with self._locks_guard:
+                    self._refreshing.discard(path)
+        
+        try:
+            self.executor.submit(run)
+        except RuntimeError:
+            # Executor already shut down (interpreter exiting)
+            with self._locks_guard:
+                self._refreshing.discard(path)
+    
+    def _refresh(self, path: str, include_hidden: bool) -> Tuple[Dict[str, List[str]], Dict[str, Callable[[], str]]]:
+        # One scan per directory at a time; later callers reuse its result
+        with self._get_lock(path):
+            now = time.monotonic()
+            cached = self._cache.get(path)
+            if cached is not None and now < self._cache_time.get(path, 0):
+                return cached[1]
+            
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime_ns = 0
+            
+            if cached is None or cached[0] != mtime_ns:
+                cached = (mtime_ns, self._scan(path, include_hidden))
+                self._cache[path] = cached
+                self._evict()
+            else:
+                self._cache.move_to_end(path)
+            
+            self._cache_time[path] = now + self.CACHE_TTL
+            return cached[1]
+    
+    def _evict(self):
+        while len(self._cache) > self.MAX_CACHED_DIRS:
+            path, _ = self._cache.popitem(last=False)
+            self._cache_time.pop(path, None)
+            # Worst case a scan still holding it overlaps with one more; it isn't leaked
+            with self._locks_guard:
+                self._locks.pop(path, None)
+    
+    def get_cached(self, path: str) -> Optional[Tuple[Dict[str, List[str]], Dict[str, Callable[[], str]]]]:
+        """Last scan result for path, without scanning or revalidating"""
+        cached = self._cache.get(path)
+        return cached[1] if cached is not None else None
+    
+    def _scan(self, path: str, include_hidden: bool) -> Tuple[Dict[str, List[str]], Dict[str, Callable[[], str]]]:
         files = []
         directories = []
         meta_dict = {}
         
         try:
-            for item in os.listdir(path):
-                if not include_hidden and item.startswith('.'):
-                    continue
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    item = entry.name
+                    if not include_hidden and item[0] == '.':
+                        continue
+                    
+                    # Formatted only when the completion menu renders this row
+                    meta_dict[item] = partial(self.metadata.get_file_info, entry)
                     
-                item_path = os.path.join(path, item)
-                
-                meta_info = self.metadata.get_file_info(item_path)
-                meta_dict[item] = meta_info
-                
-                if os.path.isdir(item_path):
-                    directories.append(item)
-                elif os.path.isfile(item_path):
-                    files.append(item)
+                    # d_type answers these without a stat, except for symlinks
+                    try:
+                        if entry.is_dir():
+                            directories.append(item)
+                        elif entry.is_file():
+                            files.append(item)
+                    except OSError:
+                        pass
                     
-        except (PermissionError, FileNotFoundError):
+        except OSError:
             pass
         
-        result = (
+        files.sort()
+        directories.sort()
+        
+        return self._make_result(files, directories, meta_dict)
+    
+    @staticmethod
+    def _make_result(files: List[str], directories: List[str], meta_dict: Dict[str, Callable[[], str]]) -> Tuple[Dict[str, List[str]], Dict[str, Callable[[], str]]]:
+        return (
             {
-                'files': sorted(files),
-                'directories': sorted(directories)
+                'files': files,
+                'directories': directories,
+                'all': files + directories,
+                'directory_set': frozenset(directories)
             },
             meta_dict
         )
+    
+    def save(self, filepath: str):
+        """Write the cached listings (not their metadata) for the next session"""
+        data = [
+            [path, mtime_ns, result[0]['files'], result[0]['directories']]
+            for path, (mtime_ns, result) in list(self._cache.items())
+        ]
         
-        self._cache[cache_key] = result
-        return result
+        try:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            tmp_path = f"{filepath}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, filepath)
+        except OSError:
+            pass
     
-    def get_completions_for_command(self, command: str, path: str = None) -> Tuple[List[str], Dict[str, str]]:
+    def load(self, filepath: str):
+        """Restore listings saved by save() whose directory mtime is unchanged"""
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        # Corrupt or written by an older format: start cold rather than fail startup
+        if not isinstance(data, list):
+            return
+        
+        for row in data[-self.MAX_CACHED_DIRS:]:
+            try:
+                path, mtime_ns, files, directories = row
+                # os.stat would take an int as a file descriptor
+                if not isinstance(path, str) or os.stat(path).st_mtime_ns != mtime_ns:
+                    continue
+                files, directories = list(files), list(directories)
+            except (OSError, TypeError, ValueError):
+                continue
+            
+            meta_dict = {
+                item: partial(self.metadata.get_file_info, os.path.join(path, item))
+                for item in files + directories
+            }
+            self._cache[path] = (mtime_ns, self._make_result(files, directories, meta_dict))
+    
+    def get_completions_for_command(self, command: str, path: str = None) -> Tuple[List[str], Dict[str, Callable[[], str]]]:
         scan_result, meta_dict = self.scan_directory(path)
         
         if command in self.DIR_COMMANDS:
@@ -199,17 +383,38 @@ class PathScanner:
         elif command in self.FILE_COMMANDS:
             items = scan_result['files']
         else:
-            items = scan_result['files'] + scan_result['directories']
+            items = scan_result['all']
+        
+        # Shared with the scan: callers only look up the names they were given
+        return items, meta_dict
+    
+    def prefilter(self, candidates: List[str], query: str, path: str = None) -> List[str]:
+        """Drop candidates missing any character of query; they cannot fuzzy-match it"""
+        if not query:
+            return candidates
+        
+        scan_result, meta_dict = self.scan_directory(path)
+        char_index = scan_result.get('char_index')
+        if char_index is None:
+            # Built on first use and dropped along with the scan it belongs to
+            char_index = {}
+            for item in meta_dict:
+                for char in set(item.lower()):
+                    char_index.setdefault(char, set()).add(item)
+            scan_result['char_index'] = char_index
         
-        filtered_meta = {item: meta_dict[item] for item in items if item in meta_dict}
+        matches = [char_index.get(char) for char in set(query.lower())]
+        if not all(matches):
+            return []
         
-        return items, filtered_meta
+        survivors = set.intersection(*matches)
+        return [candidate for candidate in candidates if candidate in survivors]
 
 
 class CommandParser:
     
-    def __init__(self):
-        self.scanner = PathScanner()
+    def __init__(self, scanner: PathScanner = None):
+        self.scanner = scanner or PathScanner()
     
     def parse_input(self, text: str) -> Dict[str, any]:
         """
@@ -222,43 +427,50 @@ class CommandParser:
             'target_directory': str
         }
         """
-        if not text.strip():
+        cwd = os.getcwd()
+        stripped = text.lstrip()
+        if not stripped.strip():
             return {
                 'command': '',
                 'args': [],
                 'current_arg': '',
                 'completion_type': 'command',
-                'target_directory': os.getcwd()
+                'target_directory': cwd
             }
         
-        parts = text.split()
-        command = parts[0] if parts else ''
-        args = parts[1:] if len(parts) > 1 else []
+        # Any whitespace separates words, tabs included; maxsplit keeps the rest unsplit
+        parts = stripped.split(None, 1)
+        if len(parts) == 1 and not text[-1:].isspace():
+            return {
+                'command': stripped,
+                'args': [],
+                'current_arg': stripped,
+                'completion_type': 'command',
+                'target_directory': cwd
+            }
         
-        if len(parts) == 1 and not text.endswith(' '):
-            completion_type = 'command'
-            current_arg = command
-        else:
-            completion_type = 'path'
-            if text.endswith(' '):
-                current_arg = ''
-            else:
-                current_arg = args[-1] if args else ''
+        command = parts[0]
+        args = parts[1].split() if len(parts) > 1 else []
+        current_arg = '' if text[-1:].isspace() or not args else args[-1]
         
-        target_directory = os.getcwd()
+        target_directory = cwd
         
         if current_arg and ('/' in current_arg or '\\' in current_arg):
             dir_part = os.path.dirname(current_arg)
             if dir_part:
-                potential_dir = os.path.join(os.getcwd(), dir_part)
-                if os.path.isdir(potential_dir):
+                potential_dir = os.path.join(cwd, dir_part)
+                # A direct child of cwd is answered by the last scan without a stat
+                cached = self.scanner.get_cached(cwd)
+                if '/' not in dir_part and cached is not None and dir_part in cached[0]['directory_set']:
+                    target_directory = potential_dir
+                elif os.path.isdir(potential_dir):
                     target_directory = potential_dir
         
         return {
             'command': command,
             'args': args,
             'current_arg': current_arg,
-            'completion_type': completion_type,
+            'completion_type': 'path',
             'target_directory': target_directory
         }
 
@@ -266,8 +478,8 @@ class CommandParser:
 class DynamicPathCompleter(Completer):
     
     def __init__(self):
-        self.parser = CommandParser()
         self.scanner = PathScanner()
+        self.parser = CommandParser(self.scanner)
         
         self.shell_commands = [
             'ls', 'cd', 'pwd', 'cat', 'less', 'more', 'head', 'tail',
@@ -304,17 +516,25 @@ class DynamicPathCompleter(Completer):
             'pip': '📦 Python package installer'
         }
         
+        # A candidate can only fuzzy-match if it contains every query character
+        self._command_bitmaps = [(cmd, _char_bitmap(cmd)) for cmd in self.shell_commands]
+        self._command_candidates = self.shell_commands
+        self._command_completer = FuzzyWordCompleter(
+            words=lambda: self._command_candidates,
+            meta_dict=self.command_meta
+        )
+        
     def get_completions(self, document: Document, complete_event):
         text = document.text_before_cursor
         context = self.parser.parse_input(text)
         
         if context['completion_type'] == 'command':
-            fuzzy_completer = FuzzyWordCompleter(
-                words=self.shell_commands,
-                meta_dict=self.command_meta
-            )
+            query_bits = _char_bitmap(context['current_arg'])
+            self._command_candidates = [
+                cmd for cmd, bits in self._command_bitmaps if bits & query_bits == query_bits
+            ]
             
-            for completion in fuzzy_completer.get_completions(document, complete_event):
+            for completion in self._command_completer.get_completions(document, complete_event):
                 yield completion
         
         elif context['completion_type'] == 'path':
@@ -324,90 +544,114 @@ class DynamicPathCompleter(Completer):
             
             candidates, meta_dict = self.scanner.get_completions_for_command(command, target_dir)
             
-            if candidates:
-                if current_arg and ('/' in current_arg or '\\' in current_arg):
-                    dir_part = os.path.dirname(current_arg)
-                    file_part = os.path.basename(current_arg)
-                    
-                    filtered_candidates = []
-                    filtered_meta = {}
-                    
-                    for candidate in candidates:
-                        if candidate.lower().startswith(file_part.lower()) or self._fuzzy_match(candidate, file_part):
-                            filtered_candidates.append(candidate)
-                            if candidate in meta_dict:
-                                filtered_meta[candidate] = meta_dict[candidate]
-                    
-                    if filtered_candidates:
-                        fuzzy_completer = FuzzyWordCompleter(
-                            words=filtered_candidates,
-                            meta_dict=filtered_meta
-                        )
-                        
-                        partial_doc = Document(file_part, len(file_part))
-                        
-                        for completion in fuzzy_completer.get_completions(partial_doc, complete_event):
-                            correct_start_position = -len(current_arg) + completion.start_position + len(file_part)
-                            
-                            if correct_start_position > 0:
-                                correct_start_position = -len(current_arg)
-                            
-                            new_completion = Completion(
-                                text=completion.text,
-                                start_position=correct_start_position,
-                                display=completion.display,
-                                display_meta=completion.display_meta
-                            )
-                            yield new_completion
-                else:
-                    fuzzy_completer = FuzzyWordCompleter(
-                        words=candidates,
-                        meta_dict=meta_dict
-                    )
-                    
-                    arg_doc = Document(current_arg, len(current_arg))
-                    
-                    for completion in fuzzy_completer.get_completions(arg_doc, complete_event):
-                        yield completion
+            if current_arg and ('/' in current_arg or '\\' in current_arg):
+                query = os.path.basename(current_arg)
+            else:
+                query = current_arg
+            
+            matches = []
+            for candidate in self.scanner.prefilter(candidates, query, target_dir):
+                score = self._fuzzy_score(candidate, query)
+                if score is not None:
+                    matches.append((score, candidate))
+            
+            # Same ordering FuzzyCompleter uses: leftmost match first, then shortest
+            matches.sort(key=itemgetter(0))
+            
+            start_position = -len(query)
+            for _, candidate in matches:
+                yield Completion(
+                    text=candidate,
+                    start_position=start_position,
+                    display=candidate,
+                    display_meta=meta_dict.get(candidate)
+                )
     
-    def _fuzzy_match(self, candidate: str, query: str) -> bool:
+    def _fuzzy_score(self, candidate: str, query: str) -> Optional[Tuple[int, int]]:
+        """(start, length) of the leftmost subsequence match of query, or None"""
         if not query:
-            return True
+            return (0, 0)
             
         candidate_lower = candidate.lower()
-        query_lower = query.lower()
         
-        candidate_idx = 0
-        for char in query_lower:
-            while candidate_idx < len(candidate_lower) and candidate_lower[candidate_idx] != char:
-                candidate_idx += 1
-            if candidate_idx >= len(candidate_lower):
-                return False
-            candidate_idx += 1
+        # str.find scans in C; one call per query character instead of per candidate character
+        query_lower = query.lower()
+        start = position = candidate_lower.find(query_lower[0])
+        if start < 0:
+            return None
+        for char in query_lower[1:]:
+            position = candidate_lower.find(char, position + 1)
+            if position < 0:
+                return None
         
-        return True
+        return (start, position - start + 1)
 
 class CompletionManager:
-    def __init__(self):
+    def __init__(self, cache_file: str = None):
         self.path_completer = DynamicPathCompleter()
+        self._cache_file = cache_file
+        if cache_file:
+            self.path_completer.scanner.load(cache_file)
+        self._pending_paths = set()
+        self._pending_clear = False
+        # Bounded like the scanner's cache, so visiting many directories can't grow it
+        self._dir_mtimes = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='path-scan')
+        self.path_completer.scanner.executor = self._executor
+        self.warmup()
         
     def get_completer(self):
+        self.apply_pending_refresh()
         return self.path_completer
+    
+    def warmup(self, path: str = None):
+        """Scan path in the background so the first completion doesn't block"""
+        if path is None:
+            path = os.getcwd()
+        self.path_completer.scanner.schedule_refresh(path)
         
     def update_cache(self, path: str = None):
         if path is None:
             path = os.getcwd()
         
-        cache_key = self.path_completer.scanner._get_cache_key(path)
-        if cache_key in self.path_completer.scanner._cache:
-            del self.path_completer.scanner._cache[cache_key]
-            
-        self.path_completer.scanner.metadata.clear_cache()
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        
+        # Unchanged directory listing: the cached scan is still valid
+        if mtime is not None and self._dir_mtimes.get(path) == mtime:
+            return
+        
+        self._dir_mtimes[path] = mtime
+        self._dir_mtimes.move_to_end(path)
+        if len(self._dir_mtimes) > PathScanner.MAX_CACHED_DIRS:
+            self._dir_mtimes.popitem(last=False)
+        self._pending_paths.add(path)
             
     def clear_cache(self):
-        self.path_completer.scanner._cache.clear()
-        self.path_completer.scanner._cache_time.clear()
-        self.path_completer.scanner.metadata.clear_cache()
+        self._pending_clear = True
+    
+    def apply_pending_refresh(self):
+        """Apply invalidations queued by update_cache/clear_cache in one pass"""
+        scanner = self.path_completer.scanner
+        
+        if self._pending_clear:
+            scanner.invalidate()
+            scanner.metadata.clear_cache()
+            self._dir_mtimes.clear()
+            self.warmup()
+        elif self._pending_paths:
+            for path in self._pending_paths:
+                scanner.invalidate(path)
+                self.warmup(path)
+        
+        self._pending_clear = False
+        self._pending_paths.clear()
+    
+    def save_cache(self):
+        if self._cache_file:
+            self.path_completer.scanner.save(self._cache_file)
     
     def refresh_directory(self, path: str = None):
         self.update_cache(path)
@@ -416,8 +660,8 @@ class CompletionManager:
         pass
 
 
-def create_completion_manager() -> CompletionManager:
-    return CompletionManager()
+def create_completion_manager(cache_file: str = None) -> CompletionManager:
+    return CompletionManager(cache_file)
 
 
 def get_file_metadata(file_path: str) -> str:
@@ -23,13 +23,13 @@ class Config:
     CONTEXT_FOR_AI = 5  # Number of recent commands to send to AI
     
     # Interactive Commands 
-    INTERACTIVE_COMMANDS = {
+    INTERACTIVE_COMMANDS = frozenset({
         'nano', 'vim', 'vi', 'emacs', 'mc', 'htop', 'top', 
         'fzf', 'less', 'more', 'man', 'tmux', 'screen',
         'python3', 'python', 'node', 'irb', 'psql', 'mysql',
         'nvim', 'nu', 'xonsh', 'apt', 'sudo',
         'sqlite3', 'redis-cli', 'mongo', 'bash', 'zsh', 'fish'
-    }
+    })
     
     # Syntax Highlighting Extensions
     SYNTAX_EXTENSIONS = {
@@ -51,9 +51,9 @@ class Config:
     }
     
     # Commands that should trigger syntax highlighting
-    SYNTAX_HIGHLIGHT_COMMANDS = ['cat', 'head', 'tail', 'batcat', 'bat']
+    SYNTAX_HIGHLIGHT_COMMANDS = frozenset({'cat', 'head', 'tail', 'batcat', 'bat'})
     
-    LS_COMMANDS = ['ls', 'la', 'lsd', 'll']
+    LS_COMMANDS = frozenset({'ls', 'la', 'lsd', 'll'})
     
     # File type icons and colors
     FILE_ICONS = {
@@ -118,11 +118,21 @@ class Config:
     
     # UI Configuration
     REFRESH_RATE = 10  # Rich Live refresh rate per second
+    STREAM_FLUSH_CHARS = 64  # Coalesce streamed deltas up to this many characters
+    STREAM_FLUSH_INTERVAL = 0.033  # ...or until this many seconds have passed
+    LIVE_UPDATE_INTERVAL = 1 / 12  # Rebuild the streaming frame at most this often (seconds)
+    LIVE_UPDATE_WORDS = 5  # ...unless this many new words have arrived since the last one
+    PROGRESS_WORD_BUCKET = 10  # Streaming description shows the word count rounded down to this
+    LIVE_IDLE_REFRESH = 4  # Background Live refreshes per second, just to keep spinners/timers moving
+    STREAM_SLOW_RATE = 4  # Below this many chunks/sec every chunk is drawn immediately
+    STREAM_FAST_RATE = 30  # Above this many chunks/sec frames are spaced LIVE_UPDATE_FAST_INTERVAL apart
+    LIVE_UPDATE_FAST_INTERVAL = 0.15
     
     # Directories
     CONFIG_DIR = Path.home() / '.wrapcli_awokwokw'
     LOG_FILE = CONFIG_DIR / 'shell.log'
     HISTORY_FILE = CONFIG_DIR / 'history.json'
+    COMPLETION_CACHE_FILE = CONFIG_DIR / 'completion_cache.json'
     
     # Prompts and Messages
     WELCOME_MESSAGE = """🚀 [bold]Hybrid Shell[/bold] Started!
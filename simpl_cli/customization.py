@@ -2,25 +2,19 @@
 import os
 import json
 import re
+import stat
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from prompt_toolkit.formatted_text import FormattedText
 from prompt_toolkit.styles import Style
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
-from rich.progress import (
-        Progress,
-        SpinnerColumn,
-        TextColumn,
-        TimeElapsedColumn, 
-        BarColumn,
-        TaskProgressColumn,
-        MofNCompleteColumn
-        )
-from rich.syntax import Syntax
-from rich.markdown import Markdown
 from rich.status import Status
 from rich.console import Group
 from rich.live import Live
@@ -29,9 +23,132 @@ from rich.align import Align
 from .config import Config
 from .environment import get_prompt_env_indicators, get_status_info, get_all_env_info
 
+
+# File mode column of `ls -l`, including setuid/sticky bits and ACL/SELinux markers
+_PERM_RE = re.compile(r'[-dlbcsp][rwxsStTl-]{9}[.+]?')
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+# Below this many entries a thread pool costs more than the stat calls it overlaps
+_STAT_PREFETCH_MIN = 32
+_STAT_PREFETCH_WORKERS = 8
+
+# Divider between entries in the AI context
+_SEP = "-" * 50
+
+# Longest slice of a command's output the AI context ever shows
+_MAX_CONTEXT_OUTPUT = 800
+
+# strftime's %b in the C locale, which is what the listing has always shown
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Longest extensions first so '.json' wins over '.js' at the same position
+_SYNTAX_EXT_RE = re.compile(
+    '(' + '|'.join(re.escape(ext) for ext in sorted(Config.SYNTAX_EXTENSIONS, key=len, reverse=True)) + r')(?!\w)'
+)
+
+
+# Wording for the two streaming flows that share StreamingUIManager._run_stream
+_STREAM_LABELS = {
+    'preparing': "🤖 Preparing AI connection...",
+    'initial_title': "🤖 AI Assistant",
+    'initial_border': "blue",
+    'started': "🚀 AI Streaming Response",
+    'streaming_title': "🤖 AI Assistant Response",
+    'streaming': "🚀 Streaming",
+    'complete': "✅ Complete",
+    'complete_title': "🤖 AI Assistant - Complete",
+    'cancelled': "⚠️ Cancelled by user",
+    'cancelled_title': "🤖 AI Assistant - Cancelled",
+    'cancelled_body': Align.center("⚠️ Response cancelled by user"),
+    'cancelled_result': "⚠️ Response cancelled",
+    'error': "❌ Connection error",
+    'error_prefix': "❌ Error",
+    'error_title': "🤖 AI Assistant - Error",
+}
+
+_RESUME_LABELS = {
+    'preparing': "🔄 Resuming AI response...",
+    'initial_title': "🤖 AI Assistant - Resume",
+    'initial_border': "yellow",
+    'started': "🚀 Resuming AI Response",
+    'streaming_title': "🤖 AI Assistant - Resuming",
+    'streaming': "🚀 Resuming",
+    'complete': "✅ Resume Complete",
+    'complete_title': "🤖 AI Assistant - Resume Complete",
+    'cancelled': "⚠️ Resume cancelled by user",
+    'cancelled_title': "🤖 AI Assistant - Resume Cancelled",
+    'cancelled_body': Align.center("⚠️ Resume cancelled by user"),
+    'cancelled_result': "⚠️ Resume cancelled",
+    'error': "❌ Resume error",
+    'error_prefix': "❌ Resume Error",
+    'error_title': "🤖 AI Assistant - Resume Error",
+}
+
+
+def _build_progress(description_style: str = "bold blue", spinner_brackets: bool = False,
+                    percentage_format: str = "[progress.percentage]{task.percentage:>3.0f}%",
+                    **bar_styles):
+    from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn, BarColumn, TaskProgressColumn, MofNCompleteColumn
+    
+    # Columns keep per-task render caches keyed by task id, so each Progress needs its own
+    spinner = SpinnerColumn("point")
+    columns = [TextColumn("["), spinner, TextColumn("]")] if spinner_brackets else [spinner]
+    columns += [
+        TextColumn(f"[{description_style}]{{task.description}}"),
+        BarColumn(bar_width=None, **bar_styles),
+        TaskProgressColumn(text_format=percentage_format),
+        MofNCompleteColumn(),
+        TextColumn("•"),
+        TimeElapsedColumn(),
+    ]
+    return Progress(*columns, transient=False)
+
+
+def _restyle_panel(panel: Panel, renderable, title: str, border_style: str, padding: tuple):
+    panel.renderable = renderable
+    panel.title = title
+    panel.border_style = border_style
+    panel.padding = padding
+
+
+class _StreamingBody:
+    # Resolved at render time, so Live's idle refresh also draws chunks the
+    # redraw throttle skipped, instead of the last frame the loop pushed
+    def __init__(self, renderer):
+        self._renderer = renderer
+    
+    def __rich__(self):
+        return self._renderer.get_streaming_content()
+
+
+def _prefetch_stat(entry):
+    try:
+        entry.stat()
+    except OSError:
+        pass
+
+
+@lru_cache(maxsize=1024)
+def _type_for_extension(ext: str) -> str:
+    return Config.FILE_EXTENSIONS.get('.' + ext.lower(), 'file')
+
+
+@lru_cache(maxsize=64)
+def _icon_and_color(file_type: str, is_hidden: bool) -> tuple:
+    icon = Config.FILE_ICONS.get(file_type, Config.FILE_ICONS['file'])
+    color = Config.FILE_COLORS.get('hidden' if is_hidden else file_type, Config.FILE_COLORS['file'])
+    return icon, color
+
+
 class UIManager:
     def __init__(self, console: Console):
         self.console = console
+        self._style = None
+        self._help_group = None
+        # The app only changes directory through cd, which reports back via
+        # display_directory_change, so the prompt needn't ask the kernel each render
+        self._cwd = os.getcwd()
     
     def get_prompt_text(self, mode: str):
         prompt_parts = []
@@ -48,13 +165,16 @@ class UIManager:
         
         prompt_parts.extend([
             ('class:separator', '│'),
-            ('class:path', f'{os.getcwd()}'),
+            ('class:path', self._cwd),
             ('class:prompt', ' ~❯ ')
         ])
         
         return FormattedText(prompt_parts)
     
     def get_style(self):
+        if self._style is not None:
+            return self._style
+        
         environment_styles = {
             'env_python': 'fg:#3776ab bold',      # Python blue
             'env_git': 'fg:#f05033 bold',         # Git orange-red  
@@ -64,7 +184,8 @@ class UIManager:
         }
         
         combined_styles = {**Config.PROMPT_STYLES, **environment_styles}
-        return Style.from_dict(combined_styles)
+        self._style = Style.from_dict(combined_styles)
+        return self._style
     
     def show_welcome(self):
         env_info = get_all_env_info()
@@ -103,6 +224,12 @@ class UIManager:
         self.console.print()
     
     def show_help(self):
+        if self._help_group is None:
+            self._help_group = self._build_help_group()
+        
+        self.console.print(self._help_group)
+    
+    def _build_help_group(self) -> Group:
         help_table = Table(title="🚀 Hybrid Shell Commands", show_header=True, header_style="bold blue")
         help_table.add_column("Keybind", style="cyan", no_wrap=True)
         help_table.add_column("Description", style="white")
@@ -137,11 +264,14 @@ class UIManager:
         for command, description in env_commands:
             env_table.add_row(command, description)
         
-        self.console.print("")
-        self.console.print(Panel(help_table, title="[bold]Keybindings[/bold]", border_style="blue"))
-        self.console.print(Panel(special_table, title="[bold]Commands[/bold]", border_style="green"))
-        self.console.print(Panel(env_table, title="[bold]Environment[/bold]", border_style="magenta"))
-        self.console.print("")
+        # Blank lines are part of the group so the whole help is a single print
+        return Group(
+            "",
+            Panel(help_table, title="[bold]Keybindings[/bold]", border_style="blue"),
+            Panel(special_table, title="[bold]Commands[/bold]", border_style="green"),
+            Panel(env_table, title="[bold]Environment[/bold]", border_style="magenta"),
+            "",
+        )
 
     def show_environment_status(self):
         env_info = get_all_env_info()
@@ -234,7 +364,7 @@ class UIManager:
     def show_conversation_cleared(self):
         self.console.print(Panel("🧹 Conversation history cleared", title="[green]Cleared[/green]", border_style="green"))
     
-    def show_context_table(self, shell_context: list):
+    def show_context_table(self, shell_context):
         if not shell_context:
             self.console.print(Panel(
                 "[yellow]No shell context available[/yellow]",
@@ -249,7 +379,8 @@ class UIManager:
         context_table.add_column("Directory", style="yellow", no_wrap=True)
         context_table.add_column("Output Preview", style="white")
         
-        for entry in shell_context[-Config.CONTEXT_FOR_AI:]:
+        # islice rather than a slice so a deque works as well as a list
+        for entry in islice(shell_context, max(len(shell_context) - Config.CONTEXT_FOR_AI, 0), None):
             output_preview = entry['output'][:50] + "..." if len(entry['output']) > 50 else entry['output']
             output_preview = output_preview.replace('\n', ' ')
             
@@ -263,7 +394,7 @@ class UIManager:
         self.console.print(Panel(context_table, border_style="cyan"))
     
     def display_shell_output(self, command: str, result):
-        base_cmd = command.strip().split()[0]
+        base_cmd = (command.split(None, 1) or [''])[0]
         if self._should_use_ls_table(command, base_cmd):
             self._display_ls_table(command, result)
             return
@@ -347,7 +478,8 @@ class UIManager:
         # Create table
         table = Table(show_header=True, header_style="bold cyan", box=None)
         
-        lines = ls_output.strip().split('\n')
+        # Split once; blank lines (including the trailing one) are skipped below
+        lines = ls_output.split('\n')
         has_details = self._is_detailed_listing(lines, command)
         
         if has_details:
@@ -367,6 +499,21 @@ class UIManager:
             table.add_column("Modified", style="yellow")
         
         target_dir = self._extract_target_directory(command)
+        
+        # One directory read gives every simple row its type and a cached stat
+        entries = {}
+        if not has_details:
+            try:
+                with os.scandir(target_dir) as it:
+                    entries = {entry.name: entry for entry in it}
+            except OSError:
+                pass
+            if len(entries) >= _STAT_PREFETCH_MIN:
+                # DirEntry caches its stat, so warming them concurrently lets the
+                # blocking syscalls overlap before the rows are built in order
+                with ThreadPoolExecutor(max_workers=_STAT_PREFETCH_WORKERS) as executor:
+                    executor.map(_prefetch_stat, entries.values())
+        
         for line in lines:
             line = line.strip()
             if not line or line.startswith('total '):
@@ -376,7 +523,7 @@ class UIManager:
                 if has_details:
                     self._add_detailed_row(table, line, target_dir)
                 else:
-                    self._add_simple_row(table, line, target_dir)
+                    self._add_simple_row(table, line, target_dir, entries.get(line))
             except Exception as e:
                 continue
         
@@ -394,25 +541,21 @@ class UIManager:
                 
             parts = line.split()
             if len(parts) >= 8:
-                first_part = parts[0]
-                if (len(first_part) == 10 and 
-                    first_part[0] in '-dlbcsp' and 
-                    all(c in 'rwx-' for c in first_part[1:])):
+                if _PERM_RE.fullmatch(parts[0]):
                     detailed_patterns += 1
         
-        non_empty_lines = len([l for l in lines if l.strip() and not l.startswith('total')])
+        non_empty_lines = sum(1 for l in lines if l.strip() and not l.startswith('total'))
         return detailed_patterns > 0 and (detailed_patterns / max(non_empty_lines, 1)) > 0.5
     
     def _extract_target_directory(self, command: str) -> str:
-        parts = command.split()
-        for part in parts[1:]:
+        for part in command.split()[1:]:
             if not part.startswith('-'):
                 if os.path.isabs(part):
                     return part
                 else:
-                    return os.path.join(os.getcwd(), part)
+                    return os.path.join(self._cwd, part)
         
-        return os.getcwd()
+        return self._cwd
     
     def _add_detailed_row(self, table: Table, line: str, current_dir: str):
         parts = line.split()
@@ -434,115 +577,120 @@ class UIManager:
             
         date_str = ' '.join(date_parts)
         
-        file_type, icon, color = self._get_file_info(name, current_dir, permissions)
+        file_type, icon, color = self._file_info_from_perms(permissions, name)
         
         formatted_size = self._format_size(size) if size.isdigit() else size
         
         table.add_row(
-            f"[dim]{permissions}[/dim]",
-            f"[dim]{links}[/dim]",
-            f"[dim]{owner}[/dim]", 
-            f"[dim]{group}[/dim]",
-            f"[cyan]{formatted_size}[/cyan]",
-            f"[yellow]{date_str}[/yellow]",
-            f"[{color}]{icon} {name}[/{color}]"
+            Text(permissions, style="dim"),
+            Text(links, style="dim"),
+            Text(owner, style="dim"),
+            Text(group, style="dim"),
+            Text(formatted_size, style="cyan"),
+            Text(date_str, style="yellow"),
+            Text(f"{icon} {name}", style=color)
         )
     
-    def _add_simple_row(self, table: Table, filename: str, current_dir: str):
+    def _add_simple_row(self, table: Table, filename: str, current_dir: str, entry: os.DirEntry = None):
         try:
             file_path = os.path.join(current_dir, filename)
-            file_type, icon, color = self._get_file_info(filename, current_dir)
+            file_type, icon, color = self._file_info_from_stat(filename, current_dir, entry)
             
             size = "-"
             mtime = "?"
             
             try:
-                if os.path.exists(file_path):
-                    stat_info = os.stat(file_path)
-                    if not os.path.isdir(file_path):
-                        size = self._format_size(stat_info.st_size)
-                    else:
-                        size = "-"
-                    mtime = datetime.fromtimestamp(stat_info.st_mtime).strftime("%b %d %H:%M")
-                else:
-                    if os.getcwd() == current_dir:
-                        stat_info = os.stat(filename)
-                        if not os.path.isdir(filename):
-                            size = self._format_size(stat_info.st_size)
-                        mtime = datetime.fromtimestamp(stat_info.st_mtime).strftime("%b %d %H:%M")
+                stat_info = entry.stat() if entry is not None else os.stat(file_path)
+                if not stat.S_ISDIR(stat_info.st_mode):
+                    size = self._format_size(stat_info.st_size)
+                lt = time.localtime(stat_info.st_mtime)
+                mtime = f"{_MONTHS[lt.tm_mon - 1]} {lt.tm_mday:02d} {lt.tm_hour:02d}:{lt.tm_min:02d}"
                     
             except (OSError, PermissionError, FileNotFoundError):
                 size = "?"
                 mtime = "?"
             
             table.add_row(
-                f"[{color}]{icon}[/{color}]",
-                f"[{color}]{filename}[/{color}]",
-                f"[cyan]{size}[/cyan]",
-                f"[yellow]{mtime}[/yellow]"
+                Text(icon, style=color),
+                Text(filename, style=color),
+                Text(size, style="cyan"),
+                Text(mtime, style="yellow")
             )
             
         except Exception as e:
-            file_type, icon, color = self._get_file_info(filename, current_dir)
+            file_type, icon, color = self._file_info_from_stat(filename, current_dir)
             table.add_row(
-                f"[{color}]{icon}[/{color}]",
-                f"[{color}]{filename}[/{color}]",
-                "[dim]?[/dim]",
-                "[dim]?[/dim]"
+                Text(icon, style=color),
+                Text(filename, style=color),
+                Text("?", style="dim"),
+                Text("?", style="dim")
             )
     
-    def _get_file_info(self, filename: str, current_dir: str, permissions: str = None):
-        file_path = os.path.join(current_dir, filename)
+    def _file_info_from_perms(self, permissions: str, filename: str):
+        if permissions.startswith('d'):
+            file_type = 'directory'
+        elif permissions.startswith('l'):
+            file_type = 'symlink'
+        elif 'x' in permissions:
+            file_type = 'executable'
+        else:
+            file_type = self._get_file_type_by_extension(filename)
+        
+        icon, color = _icon_and_color(file_type, filename.startswith('.'))
         
+        return file_type, icon, color
+    
+    def _file_info_from_stat(self, filename: str, current_dir: str, entry: os.DirEntry = None):
         is_hidden = filename.startswith('.')
         
         try:
-            if permissions:
-                if permissions.startswith('d'):
-                    file_type = 'directory'
-                elif permissions.startswith('l'):
-                    file_type = 'symlink'  
-                elif 'x' in permissions:
-                    file_type = 'executable'
-                else:
-                    file_type = self._get_file_type_by_extension(filename)
-            elif os.path.exists(file_path):
-                if os.path.isdir(file_path):
+            if entry is not None:
+                if entry.is_dir():
                     file_type = 'directory'
-                elif os.path.islink(file_path):
+                elif entry.is_symlink():
                     file_type = 'symlink'
-                elif os.access(file_path, os.X_OK) and not os.path.isdir(file_path):
+                elif entry.stat().st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
                     file_type = 'executable'
                 else:
                     file_type = self._get_file_type_by_extension(filename)
             else:
-                alt_path = os.path.join(os.getcwd(), filename)
-                if current_dir != os.getcwd() and os.path.exists(alt_path):
-                    if os.path.isdir(alt_path):
+                file_path = os.path.join(current_dir, filename)
+                if os.path.exists(file_path):
+                    if os.path.isdir(file_path):
                         file_type = 'directory'
-                    elif os.path.islink(alt_path):
+                    elif os.path.islink(file_path):
                         file_type = 'symlink'
-                    elif os.access(alt_path, os.X_OK):
+                    elif os.access(file_path, os.X_OK) and not os.path.isdir(file_path):
                         file_type = 'executable'
                     else:
                         file_type = self._get_file_type_by_extension(filename)
                 else:
-                    file_type = self._get_file_type_by_extension(filename)
+                    alt_path = os.path.join(self._cwd, filename)
+                    if current_dir != self._cwd and os.path.exists(alt_path):
+                        if os.path.isdir(alt_path):
+                            file_type = 'directory'
+                        elif os.path.islink(alt_path):
+                            file_type = 'symlink'
+                        elif os.access(alt_path, os.X_OK):
+                            file_type = 'executable'
+                        else:
+                            file_type = self._get_file_type_by_extension(filename)
+                    else:
+                        file_type = self._get_file_type_by_extension(filename)
                 
         except (OSError, PermissionError):
             file_type = self._get_file_type_by_extension(filename)
         
-        icon = Config.FILE_ICONS.get(file_type, Config.FILE_ICONS['file'])
-        color = Config.FILE_COLORS.get('hidden' if is_hidden else file_type, Config.FILE_COLORS['file'])
+        icon, color = _icon_and_color(file_type, is_hidden)
         
         return file_type, icon, color
     
     def _get_file_type_by_extension(self, filename: str) -> str:
-        if not filename or filename.startswith('.') and '.' not in filename[1:]:
+        stem, _, ext = filename.rpartition('.')
+        # No dot at all, or only the leading dot of a dotfile
+        if not stem:
             return 'file'
-            
-        ext = '.' + filename.split('.')[-1].lower() if '.' in filename else ''
-        return Config.FILE_EXTENSIONS.get(ext, 'file')
+        return _type_for_extension(ext)
     
     def _format_size(self, size_bytes) -> str:
         try:
@@ -550,35 +698,35 @@ class UIManager:
         except (ValueError, TypeError):
             return str(size_bytes)
             
-        if size_bytes == 0:
-            return "0 B"
-        
-        size_names = ["B", "KB", "MB", "GB", "TB"]
-        i = 0
-        while size_bytes >= 1024 and i < len(size_names) - 1:
-            size_bytes /= 1024.0
-            i += 1
+        if size_bytes < 1024:
+            return f"{size_bytes} B"
         
-        if i == 0:
-            return f"{size_bytes} {size_names[i]}"
-        else:
-            return f"{size_bytes:.1f} {size_names[i]}"
+        # Unit index is floor(log1024(size)), read off the bit length
+        i = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+        return f"{size_bytes / (1 << (10 * i)):.1f} {_SIZE_UNITS[i]}"
     
     def _try_syntax_highlighting(self, command: str, output: str):
-        base_cmd = command.split()[0]
+        from rich.syntax import Syntax
+        
+        base_cmd = (command.split(None, 1) or [''])[0]
         if base_cmd not in Config.SYNTAX_HIGHLIGHT_COMMANDS:
             return output
         
-        for ext, lang in Config.SYNTAX_EXTENSIONS.items():
-            if ext in command:
-                try:
-                    return Syntax(output, lang, theme="github-dark", line_numbers=True, indent_guides=True)
-                except:
-                    break
+        match = _SYNTAX_EXT_RE.search(command)
+        if match:
+            try:
+                return Syntax(output, Config.SYNTAX_EXTENSIONS[match.group(1)], theme="github-dark", line_numbers=True, indent_guides=True)
+            except:
+                pass
         
         return output
     
+    def refresh_cwd(self):
+        self._cwd = os.getcwd()
+        return self._cwd
+    
     def display_directory_change(self, command: str, new_dir: str):
+        self._cwd = new_dir
         output = f"Changed directory to: {new_dir}"
         self.console.print(Panel(
             f"[green]{output}[/green]",
@@ -670,48 +818,92 @@ class LiveMarkdownStreamRenderer:
     def __init__(self, console: Console, max_visible_lines: int = 20):
         self.console = console
         self.max_visible_lines = max_visible_lines
-        self.rolling_buffer = []
+        self.rolling_buffer = deque(maxlen=max_visible_lines)
         self.full_content = ""
         self.current_line = ""
         self.word_count = 0
+        self._last_rendered_key = None
+        self._last_renderable = None
         
     def reset(self):
-        self.rolling_buffer = []
-        self.full_content = ""
+        self.seed("")
+    
+    def seed(self, partial_content: str):
+        # Start over from an earlier partial answer; the setter counts its words once
+        self.rolling_buffer.clear()
+        self.full_content = partial_content
         self.current_line = ""
-        self.word_count = 0
     
-    def add_chunk(self, chunk: str):
-        self.full_content += chunk
-        self.current_line += chunk
-        
-        self.word_count = len(self.full_content.split())
-        
-        if '\n' in self.current_line:
-            lines = self.current_line.split('\n')
-            for completed_line in lines[:-1]:
-                self.rolling_buffer.append(completed_line)
-            self.current_line = lines[-1]
+    @property
+    def full_content(self) -> str:
+        # Chunks are joined on demand and the result kept, so repeated reads stay cheap
+        if len(self._chunks) > 1:
+            self._chunks[:] = [''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+    
+    @full_content.setter
+    def full_content(self, value: str):
+        self._chunks = [value] if value else []
+        self._version = getattr(self, '_version', 0) + 1
+        self.word_count = len(value.split())
+        self._in_word = bool(value) and not value[-1].isspace()
+    
+    def add_chunk(self, chunk: str) -> int:
+        if not chunk:
+            return self.word_count
+        
+        self._chunks.append(chunk)
+        self._version += 1
+        
+        # Count only this chunk's words; one that continues the previous chunk's last word isn't new
+        new_words = len(chunk.split())
+        if self._in_word and not chunk[0].isspace():
+            new_words -= 1
+        self.word_count += new_words
+        self._in_word = not chunk[-1].isspace()
+        
+        # Only the new chunk can hold a newline; the pending line never does
+        last_newline = chunk.rfind('\n')
+        if last_newline < 0:
+            self.current_line += chunk
+        else:
+            # The deque drops the oldest lines itself once it's full
+            self.rolling_buffer.extend((self.current_line + chunk[:last_newline]).split('\n'))
+            self.current_line = chunk[last_newline + 1:]
         
-        if len(self.rolling_buffer) > self.max_visible_lines:
-            self.rolling_buffer = self.rolling_buffer[-self.max_visible_lines:]
+        return self.word_count
     
     def get_streaming_content(self):
-        display_lines = self.rolling_buffer.copy()
+        from rich.markdown import Markdown
+        
+        # Nothing arrived since the last frame; don't parse the same Markdown again
+        key = (self._version, self.current_line)
+        if key == self._last_rendered_key:
+            return self._last_renderable
+        
+        display_lines = list(self.rolling_buffer)
         if self.current_line:
             display_lines.append(self.current_line + "▊")
+            if len(display_lines) > self.max_visible_lines:
+                del display_lines[0]
         
-        buffer_content = "\n".join(display_lines[-self.max_visible_lines:])
+        buffer_content = "\n".join(display_lines)
         
         if not buffer_content.strip():
             buffer_content = "🤔 Connecting to AI...▊"
         
         try:
-            return Markdown(buffer_content)
+            renderable = Markdown(buffer_content)
         except Exception:
-            return Text(buffer_content, overflow="fold")
+            renderable = Text(buffer_content, overflow="fold")
+        
+        self._last_rendered_key = key
+        self._last_renderable = renderable
+        return renderable
     
     def get_final_content(self):
+        from rich.markdown import Markdown
+        
         try:
             return Markdown(self.full_content)
         except Exception:
@@ -722,23 +914,35 @@ class LiveMarkdownStreamRenderer:
 
 
 class StreamingContentRenderer:
+
+    # Substrings that mark the stream as code-like; once seen, render as Markdown for good
+    _MARKDOWN_INDICATORS = ("```", "def ", "import ", "class ", "function")
+    _INDICATOR_OVERLAP = max(len(ind) for ind in _MARKDOWN_INDICATORS) - 1
     
     def __init__(self):
         self.content = ""
+        self._is_markdown = False
+        self._scanned = 0
     
     def update(self, new_content: str):
+        if len(new_content) < self._scanned:
+            # Content was replaced rather than extended; start over
+            self._is_markdown = False
+            self._scanned = 0
         self.content = new_content
+        if not self._is_markdown:
+            # Back up a little so an indicator split across updates is still seen
+            tail = new_content[max(0, self._scanned - self._INDICATOR_OVERLAP):]
+            self._is_markdown = any(ind in tail for ind in self._MARKDOWN_INDICATORS)
+        self._scanned = len(new_content)
     
     def __rich__(self):
+        from rich.markdown import Markdown
+        
         if not self.content:
             return Text("🤔 Waiting for response...")
         
-        if "```" in self.content:
-            try:
-                return Markdown(self.content)
-            except:
-                return Text(self.content)
-        elif any(indicator in self.content for indicator in ["def ", "import ", "class ", "function", "```"]):
+        if self._is_markdown:
             try:
                 return Markdown(self.content)
             except:
@@ -753,8 +957,38 @@ class StreamingUIManager:
         self.console = console
         self.markdown_renderer = LiveMarkdownStreamRenderer(console)
         self.cancelled_stream_state = None
+        self._reset_refresh_pacing()
+    
+    def _reset_refresh_pacing(self):
+        self._refresh_interval = Config.LIVE_UPDATE_INTERVAL
+        self._chunk_gap = None
+        self._last_chunk_time = None
+    
+    def _pace_refresh(self, now: float) -> float:
+        # Smooth the gap between chunks over roughly the last second and redraw
+        # as often as the stream actually changes: every chunk when it trickles in,
+        # less often than the default cadence when it floods
+        if self._last_chunk_time is not None:
+            gap = now - self._last_chunk_time
+            if self._chunk_gap is None:
+                self._chunk_gap = gap
+            else:
+                self._chunk_gap += min(gap, 1.0) * (gap - self._chunk_gap)
+            
+            rate = 1 / self._chunk_gap if self._chunk_gap > 0 else float('inf')
+            if rate < Config.STREAM_SLOW_RATE:
+                self._refresh_interval = 0.0
+            elif rate > Config.STREAM_FAST_RATE:
+                self._refresh_interval = Config.LIVE_UPDATE_FAST_INTERVAL
+            else:
+                self._refresh_interval = Config.LIVE_UPDATE_INTERVAL
+        
+        self._last_chunk_time = now
+        return self._refresh_interval
     
     def create_streaming_layout(self, streaming_content=None):
+        from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+        
         if streaming_content is None:
             streaming_content = self.markdown_renderer
             
@@ -785,78 +1019,94 @@ class StreamingUIManager:
         return layout_group, status_prog, status_id, counter_prog, counter_id
     
     def stream_ai_response_with_live_markdown(self, api_call_func, *args, **kwargs):
-
         self.markdown_renderer.reset()
         
-        progress = Progress(
-            SpinnerColumn("point"),
-            TextColumn("[bold blue]{task.description}"),
-            BarColumn(bar_width=None),
-            TaskProgressColumn(),   
-            MofNCompleteColumn(),      
-            TextColumn("•"),
-            TimeElapsedColumn(),
-            transient=False,
+        return self._run_stream(
+            api_call_func, args, kwargs,
+            labels=_STREAM_LABELS,
+            initial_message="🔄 Establishing connection to AI service...",
         )
+    
+    def _run_stream(self, api_call_func, args, kwargs, *, labels: dict, initial_message: str,
+                    on_complete=None, on_cancel=None):
+        # Shared by fresh and resumed streams; they differ only in wording and in what
+        # happens to the cancelled state afterwards
+        progress = _build_progress()
         
-        with Live(console=self.console, refresh_per_second=12) as live:
+        self._reset_refresh_pacing()
+        
+        # Frames are pushed from the loop as chunks arrive; the background refresh keeps the
+        # spinner moving and catches up on throttled text while the stream pauses
+        with Live(console=self.console, refresh_per_second=Config.LIVE_IDLE_REFRESH) as live:
             try:
-                task_id = progress.add_task("🤖 Preparing AI connection...", total=None)
+                task_id = progress.add_task(labels['preparing'], total=None)
                 
-                initial_layout = Group(
-                    progress,
-                    Panel(
-                        Align.center("🔄 Establishing connection to AI service..."),
-                        title="🤖 AI Assistant",
-                        border_style="blue",
-                        padding=(1, 2)
-                    )
+                # One panel for the whole response; each phase just restyles it
+                panel = Panel(
+                    Align.center(initial_message),
+                    title=labels['initial_title'],
+                    border_style=labels['initial_border'],
+                    padding=(1, 2)
                 )
+                layout = Group(progress, panel)
                 
-                live.update(initial_layout)
+                live.update(layout)
                 
                 first_chunk_received = False
-                estimated_total_words = 100  # Initial estimate
+                last_update = 0.0
+                last_rendered_words = 0
+                description_bucket = None
+                # A resumed stream starts from its partial answer's word count
+                estimated_total_words = max(100, self.markdown_renderer.get_word_count() + 50)
                 
                 for chunk in api_call_func(*args, **kwargs):
                     if not first_chunk_received:
                         first_chunk_received = True
                         progress.update(
                             task_id, 
-                            description="🚀 AI Streaming Response", 
+                            description=labels['started'], 
                             total=estimated_total_words, 
-                            completed=0
+                            completed=self.markdown_renderer.get_word_count()
                         )
+                        _restyle_panel(panel, _StreamingBody(self.markdown_renderer),
+                                       labels['streaming_title'], "yellow", (0, 1))
                     
-                    self.markdown_renderer.add_chunk(chunk)
-                    
-                    streaming_content = self.markdown_renderer.get_streaming_content()
-                    current_word_count = self.markdown_renderer.get_word_count()
-                    
-                    if current_word_count > estimated_total_words * 0.8:
-                        estimated_total_words = max(
-                            estimated_total_words * 1.5,
-                            current_word_count + 50
-                        )
-                        progress.update(task_id, total=int(estimated_total_words))
+                    current_word_count = self.markdown_renderer.add_chunk(chunk)
                     
-                    progress.update(
-                        task_id,
-                        completed=current_word_count,
-                        description=f"🚀 Streaming • {current_word_count} words"
-                    )
+                    # Chunks can arrive faster than Live redraws; only rebuild the frame when it'll be seen
+                    now = time.monotonic()
+                    if (now - last_update < self._pace_refresh(now) and
+                            current_word_count - last_rendered_words < Config.LIVE_UPDATE_WORDS):
+                        continue
+                    words_changed = current_word_count != last_rendered_words
+                    last_update = now
+                    last_rendered_words = current_word_count
                     
-                    layout = Group(
-                        progress,
-                        Panel(
-                            streaming_content,
-                            title="🤖 AI Assistant Response",
-                            border_style="yellow",
-                            padding=(0, 1)
+                    # The bar only moves with the word count; leave it alone otherwise
+                    if words_changed:
+                        new_total = None  # None leaves the task's total as is
+                        if current_word_count > estimated_total_words * 0.8:
+                            estimated_total_words = max(
+                                estimated_total_words * 1.5,
+                                current_word_count + 50
+                            )
+                            new_total = int(estimated_total_words)
+                        
+                        # The description only changes when the rounded count does
+                        new_description = None
+                        word_bucket = current_word_count - current_word_count % Config.PROGRESS_WORD_BUCKET
+                        if word_bucket != description_bucket:
+                            description_bucket = word_bucket
+                            new_description = f"{labels['streaming']} • {word_bucket} words"
+                        
+                        progress.update(
+                            task_id,
+                            total=new_total,
+                            completed=current_word_count,
+                            description=new_description
                         )
-                    )
                     
-                    live.update(layout)
+                    live.update(layout, refresh=True)
                 
                 final_content = self.markdown_renderer.get_final_content()
                 final_word_count = self.markdown_renderer.get_word_count()
@@ -865,20 +1115,14 @@ class StreamingUIManager:
                     task_id, 
                     total=final_word_count, 
                     completed=final_word_count, 
-                    description=f"✅ Complete • {final_word_count} words",
+                    description=f"{labels['complete']} • {final_word_count} words",
                 )
                 
-                final_layout = Group(
-                    progress,
-                    Panel(
-                        final_content,
-                        title="🤖 AI Assistant - Complete",
-                        border_style="green",
-                        padding=(0, 1)
-                    )
-                )
+                _restyle_panel(panel, final_content, labels['complete_title'], "green", (0, 1))
+                live.update(layout)
                 
-                live.update(final_layout)
+                if on_complete is not None:
+                    on_complete()
                 
                 return self.markdown_renderer.full_content
                 
@@ -888,45 +1132,30 @@ class StreamingUIManager:
                     task_id, 
                     total=max(current_word_count, 1), 
                     completed=max(current_word_count, 1),
-                    description="⚠️ Cancelled by user"
+                    description=labels['cancelled']
                 )
                 
-                partial_content = self.markdown_renderer.get_final_content() if self.markdown_renderer.full_content else Align.center("⚠️ Response cancelled by user")
+                if on_cancel is not None:
+                    on_cancel()
                 
-                cancelled_layout = Group(
-                    progress,
-                    Panel(
-                        partial_content,
-                        title="🤖 AI Assistant - Cancelled",
-                        border_style="yellow",
-                        padding=(1, 2)
-                    )
-                )
+                partial_content = self.markdown_renderer.get_final_content() if self.markdown_renderer.full_content else labels['cancelled_body']
                 
-                live.update(cancelled_layout)
+                _restyle_panel(panel, partial_content, labels['cancelled_title'], "yellow", (1, 2))
+                live.update(layout)
                                 
-                return "⚠️ Response cancelled"
+                return labels['cancelled_result']
                 
             except Exception as e:
                 progress.update(
                     task_id, 
                     total=1, 
                     completed=1,
-                    description="❌ Connection error"
+                    description=labels['error']
                 )
                 
-                error_layout = Group(
-                    progress,
-                    Panel(
-                        f"❌ Error: {str(e)}",
-                        title="🤖 AI Assistant - Error",
-                        border_style="red",
-                        padding=(1, 2)
-                    )
-                )
-                
-                live.update(error_layout)
-                return f"❌ Error: {str(e)}"
+                _restyle_panel(panel, f"{labels['error_prefix']}: {str(e)}", labels['error_title'], "red", (1, 2))
+                live.update(layout)
+                return f"{labels['error_prefix']}: {str(e)}"
     
     def save_cancelled_state(self, user_message: str, partial_content: str, messages: list):
         self.cancelled_stream_state = {
@@ -961,7 +1190,6 @@ class StreamingUIManager:
             return self.stream_ai_response_with_live_markdown(api_call_func, *args, **kwargs)
     
     def _resume_cancelled_stream(self, api_call_func, *args, **kwargs):
-
         if not self.has_cancelled_stream():
             return "❌ No cancelled stream to resume"
         
@@ -970,206 +1198,91 @@ class StreamingUIManager:
         partial_content = saved_state['partial_content']
         original_messages = saved_state['messages']
         
-        self.markdown_renderer.reset()
-        self.markdown_renderer.full_content = partial_content
-        self.markdown_renderer.current_line = ""
+        self.markdown_renderer.seed(partial_content)
         
-        self.markdown_renderer.word_count = len(partial_content.split())
+        def save_partial():
+            self.save_cancelled_state(
+                user_message, 
+                self.markdown_renderer.full_content, 
+                original_messages
+            )
         
-        progress = Progress(
-            SpinnerColumn("point"),
-            TextColumn("[bold blue]{task.description}"),
-            BarColumn(bar_width=None),
-            TaskProgressColumn(),
-            MofNCompleteColumn(),
-            TextColumn("•"),
-            TimeElapsedColumn(),
-            transient=False,
+        return self._run_stream(
+            api_call_func, args, kwargs,
+            labels=_RESUME_LABELS,
+            initial_message=f"🔄 Resuming response to: '{user_message[:50]}{'...' if len(user_message) > 50 else ''}'",
+            on_complete=self.clear_cancelled_state,
+            on_cancel=save_partial,
         )
-        
-        with Live(console=self.console, refresh_per_second=12) as live:
-            try:
-                task_id = progress.add_task("🔄 Resuming AI response...", total=None)
-                
-                resume_layout = Group(
-                    progress,
-                    Panel(
-                        Align.center(f"🔄 Resuming response to: '{user_message[:50]}{'...' if len(user_message) > 50 else ''}'"),
-                        title="🤖 AI Assistant - Resume",
-                        border_style="yellow",
-                        padding=(1, 2)
-                    )
-                )
-                live.update(resume_layout)
-                
-                first_chunk_received = False
-                estimated_total_words = max(100, self.markdown_renderer.get_word_count() + 50)
-                
-                for chunk in api_call_func(*args, **kwargs):
-                    if not first_chunk_received:
-                        first_chunk_received = True
-                        progress.update(
-                            task_id, 
-                            description="🚀 Resuming AI Response", 
-                            total=estimated_total_words, 
-                            completed=self.markdown_renderer.get_word_count()
-                        )
-                    
-                    self.markdown_renderer.add_chunk(chunk)
-                    
-                    streaming_content = self.markdown_renderer.get_streaming_content()
-                    current_word_count = self.markdown_renderer.get_word_count()
-                    
-                    if current_word_count > estimated_total_words * 0.8:
-                        estimated_total_words = max(
-                            estimated_total_words * 1.5,
-                            current_word_count + 50
-                        )
-                        progress.update(task_id, total=int(estimated_total_words))
-                    
-                    progress.update(
-                        task_id,
-                        completed=current_word_count,
-                        description=f"🚀 Resuming • {current_word_count} words"
-                    )
-                    
-                    layout = Group(
-                        progress,
-                        Panel(
-                            streaming_content,
-                            title="🤖 AI Assistant - Resuming",
-                            border_style="yellow",
-                            padding=(0, 1)
-                        )
-                    )
-                    
-                    live.update(layout)
-                
-                final_content = self.markdown_renderer.get_final_content()
-                final_word_count = self.markdown_renderer.get_word_count()
-                
-                progress.update(
-                    task_id, 
-                    total=final_word_count, 
-                    completed=final_word_count, 
-                    description=f"✅ Resume Complete • {final_word_count} words",
-                )
-                
-                final_layout = Group(
-                    progress,
-                    Panel(
-                        final_content,
-                        title="🤖 AI Assistant - Resume Complete",
-                        border_style="green",
-                        padding=(0, 1)
-                    )
-                )
-                
-                live.update(final_layout)
-                
-                self.clear_cancelled_state()
-                
-                return self.markdown_renderer.full_content
-                
-            except KeyboardInterrupt:
-                current_word_count = self.markdown_renderer.get_word_count()
-                progress.update(
-                    task_id, 
-                    total=max(current_word_count, 1), 
-                    completed=max(current_word_count, 1),
-                    description="⚠️ Resume cancelled by user"
-                )
-                
-                self.save_cancelled_state(
-                    user_message, 
-                    self.markdown_renderer.full_content, 
-                    original_messages
-                )
-                
-                partial_content = self.markdown_renderer.get_final_content() if self.markdown_renderer.full_content else Align.center("⚠️ Resume cancelled by user")
-                
-                cancelled_layout = Group(
-                    progress,
-                    Panel(
-                        partial_content,
-                        title="🤖 AI Assistant - Resume Cancelled",
-                        border_style="yellow",
-                        padding=(1, 2)
-                    )
-                )
-                
-                live.update(cancelled_layout)
-                return "⚠️ Resume cancelled"
-                
-            except Exception as e:
-                progress.update(
-                    task_id, 
-                    total=1, 
-                    completed=1,
-                    description="❌ Resume error"
-                )
-                
-                error_layout = Group(
-                    progress,
-                    Panel(
-                        f"❌ Resume Error: {str(e)}",
-                        title="🤖 AI Assistant - Resume Error",
-                        border_style="red",
-                        padding=(1, 2)
-                    )
-                )
-                
-                live.update(error_layout)
-                return f"❌ Resume Error: {str(e)}"
 
 
 class ContextManager:
     
     def __init__(self):
-        self.shell_context = []
-        self.conversation_history = []
+        # Bounded ring buffers: appending past maxlen drops the oldest entry
+        self.shell_context = deque(maxlen=Config.MAX_SHELL_CONTEXT)
+        self.conversation_history = deque(maxlen=Config.MAX_CONVERSATION_HISTORY)
+        # Set whenever conversation_history differs from what's on disk
+        self._history_dirty = False
+        # (path, mtime_ns, size) of the history file as last loaded or saved
+        self._history_signature = None
+        # Bumped on every shell_context change; the rendered context is reused until it moves
+        self._context_version = 0
+        self._context_cache = None
     
     def add_shell_context(self, command: str, output: str):
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        now = datetime.now()
+        # Nothing past the first _MAX_CONTEXT_OUTPUT chars is ever shown, so don't hold on to it
         context_entry = {
-            "timestamp": timestamp,
+            "timestamp": now.strftime("%H:%M:%S"),
             "command": command,
-            "output": output,
+            "output": output[:_MAX_CONTEXT_OUTPUT],
+            "output_truncated": len(output) > _MAX_CONTEXT_OUTPUT,
             "cwd": os.getcwd(),
-            "epoch_time": datetime.now().timestamp()
+            "epoch_time": now.timestamp()
         }
         self.shell_context.append(context_entry)
-        
-        if len(self.shell_context) > Config.MAX_SHELL_CONTEXT:
-            self.shell_context.pop(0)
+        self._context_version += 1
     
     def build_context_for_ai(self) -> str:
+        cached = self._context_cache
+        if cached is not None and cached[0] == self._context_version:
+            return cached[1]
+        
+        context = self._format_shell_context()
+        self._context_cache = (self._context_version, context)
+        return context
+    
+    def _format_shell_context(self) -> str:
         if not self.shell_context:
             return ""
         
-        recent_contexts = sorted(self.shell_context, 
-                               key=lambda x: x.get('epoch_time', 0), 
-                               reverse=True)
+        # Entries are only ever appended, so newest-first is just reverse order; both
+        # groups below are taken off this one iterator without copying the whole deque
+        recent_contexts = reversed(self.shell_context)
         
         context_parts = ["Recent shell activity (prioritized by recency):"]
         
-        priority_contexts = recent_contexts[:3]
+        priority_contexts = list(islice(recent_contexts, 3))
         if priority_contexts:
             context_parts.append("\n🔥 MOST RECENT COMMANDS:")
             for i, entry in enumerate(priority_contexts):
                 priority_marker = ">>> LATEST:" if i == 0 else f">>> #{i+1}:"
-                context_parts.append(f"\n{priority_marker} [{entry['timestamp']}] In: {entry['cwd']}")
-                context_parts.append(f"Command: {entry['command']}")
-                
+                output_line = ""
                 if entry['output']:
                     output = entry['output']
-                    max_length = 800 if i == 0 else 400  
-                    if len(output) > max_length:
+                    max_length = _MAX_CONTEXT_OUTPUT if i == 0 else 400  
+                    if len(output) > max_length or entry['output_truncated']:
                         output = output[:max_length] + "... (truncated)"
-                    context_parts.append(f"Output: {output}")
-                context_parts.append("-" * 50)
+                    output_line = f"Output: {output}\n"
+                # One string per entry; the final join adds the newline after the separator
+                context_parts.append(
+                    f"\n{priority_marker} [{entry['timestamp']}] In: {entry['cwd']}\n"
+                    f"Command: {entry['command']}\n"
+                    f"{output_line}{_SEP}"
+                )
         
-        older_contexts = recent_contexts[3:Config.CONTEXT_FOR_AI]
+        older_contexts = list(islice(recent_contexts, max(Config.CONTEXT_FOR_AI - 3, 0)))
         if older_contexts:
             context_parts.append("\n📋 ADDITIONAL CONTEXT (older commands):")
             for entry in older_contexts:
@@ -1179,14 +1292,24 @@ class ContextManager:
         
         return "\n".join(context_parts)
     
+    def build_ai_messages(self, user_message: str) -> list:
+        user_turn = {"role": "user", "content": user_message}
+        
+        context = self.build_context_for_ai()
+        if not context:
+            return [*self.conversation_history, user_turn]
+        
+        system_turn = {
+            "role": "system",
+            "content": f"You are a helpful AI assistant integrated with a shell environment. {context}\n\nUse this context to provide relevant answers about files, directories, or commands the user has executed."
+        }
+        return [system_turn, *self.conversation_history, user_turn]
+    
     def get_latest_command_context(self) -> dict:
         if not self.shell_context:
             return None
         
-        recent_contexts = sorted(self.shell_context, 
-                               key=lambda x: x.get('epoch_time', 0), 
-                               reverse=True)
-        return recent_contexts[0]
+        return self.shell_context[-1]
     
     def add_conversation(self, user_message: str, ai_response: str):
         self.conversation_history.append({
@@ -1197,15 +1320,15 @@ class ContextManager:
             "role": "assistant", 
             "content": ai_response
         })
-        
-        if len(self.conversation_history) > Config.MAX_CONVERSATION_HISTORY:
-            self.conversation_history = self.conversation_history[-Config.MAX_CONVERSATION_HISTORY:]
+        self._history_dirty = True
     
     def clear_context(self):
-        self.shell_context = []
+        self.shell_context.clear()
+        self._context_version += 1
     
     def clear_conversation(self):
-        self.conversation_history = []
+        self.conversation_history.clear()
+        self._history_dirty = True
     
     def clear_all(self):
         self.clear_context()
@@ -1213,12 +1336,21 @@ class ContextManager:
     
     def save_history(self, filepath: str = None):
         if filepath is None:
+            if not self._history_dirty:
+                return
             filepath = Config.HISTORY_FILE
         
         try:
             Config.ensure_directories()
-            with open(filepath, 'w') as f:
-                json.dump(self.conversation_history, f, indent=2)
+            # Write a sibling file and swap it in so a crash never leaves half a history
+            tmp_path = f"{filepath}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                # No indent: json.dump then streams through the C encoder instead of the pure-Python one
+                json.dump(list(self.conversation_history), f)
+            os.replace(tmp_path, filepath)
+            self._history_dirty = False
+            st = os.stat(filepath)
+            self._history_signature = (str(filepath), st.st_mtime_ns, st.st_size)
         except Exception as e:
             print(f"Failed to save history: {e}")
     
@@ -1227,20 +1359,48 @@ class ContextManager:
             filepath = Config.HISTORY_FILE
         
         try:
-            if os.path.exists(filepath):
-                with open(filepath, 'r') as f:
-                    self.conversation_history = json.load(f)
+            st = os.stat(filepath)
+        except OSError:
+            return
+        
+        # Memory already mirrors this exact file; skip the read and parse
+        signature = (str(filepath), st.st_mtime_ns, st.st_size)
+        if signature == self._history_signature and not self._history_dirty:
+            return
+        
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                self.conversation_history = deque(json.load(f), maxlen=Config.MAX_CONVERSATION_HISTORY)
+            self._history_signature = signature
+            self._history_dirty = False
         except Exception as e:
             print(f"Failed to load history: {e}")
-            self.conversation_history = []
+            self.conversation_history = deque(maxlen=Config.MAX_CONVERSATION_HISTORY)
 
 
 class EnhancedContextManager(ContextManager):
     
+    def __init__(self):
+        super().__init__()
+        self._enhanced_cache = None
+    
     def build_context_for_ai(self) -> str:
+        # Both inputs come back as the very same objects while nothing has changed:
+        # the env info from its TTL cache, the shell part from the base class cache
+        env_info = get_all_env_info()
+        shell_context = super().build_context_for_ai()
+        
+        cached = self._enhanced_cache
+        if cached is not None and cached[0] is env_info and cached[1] is shell_context:
+            return cached[2]
+        
+        context = self._format_enhanced_context(env_info, shell_context)
+        self._enhanced_cache = (env_info, shell_context, context)
+        return context
+    
+    def _format_enhanced_context(self, env_info: dict, shell_context: str) -> str:
         context_parts = []
         
-        env_info = get_all_env_info()
         if any(env_info.values()):  
             context_parts.append("🌍 CURRENT ENVIRONMENT:")
             
@@ -1268,7 +1428,6 @@ class EnhancedContextManager(ContextManager):
             
             context_parts.append("-" * 60)
         
-        shell_context = super().build_context_for_ai()
         if shell_context:
             context_parts.append(shell_context)
         
@@ -1313,22 +1472,13 @@ def example_integration_with_existing_streaming():
     return response
 
 def create_custom_progress_style():
-    return Progress(
-        TextColumn("["),
-        SpinnerColumn("point"),
-        TextColumn("]"), 
-        TextColumn("[bold cyan]{task.description}"),
-        BarColumn(
-            bar_width=None,
-            style="cyan",
-            complete_style="green",
-            finished_style="green"
-        ),
-        TaskProgressColumn(text_format="{task.percentage:>3.0f}%"),
-        MofNCompleteColumn(),
-        TextColumn("•"),
-        TimeElapsedColumn(),
-        transient=False
+    return _build_progress(
+        "bold cyan",
+        spinner_brackets=True,
+        percentage_format="{task.percentage:>3.0f}%",
+        style="cyan",
+        complete_style="green",
+        finished_style="green"
     )
 
 
@@ -1,31 +1,197 @@
 #!/usr/bin/env python3
 import os
+import re
 import sys
 import subprocess
 import json
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, List, Tuple
-import psutil
-from datetime import datetime
+from functools import lru_cache
+
+
+def _find_git_marker(path: str) -> Optional[str]:
+    if os.environ.get('GIT_DIR'):
+        return os.environ['GIT_DIR']
+    # `.git` is a directory in a normal checkout and a file in worktrees/submodules
+    while True:
+        marker = os.path.join(path, '.git')
+        if os.path.exists(marker):
+            return marker
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def _git_signature(marker: Optional[str]) -> Optional[tuple]:
+    # mtimes of the files a commit, checkout, reset or add always rewrites
+    if marker is None:
+        return None
+    
+    git_dir = marker
+    if not os.path.isdir(marker):
+        try:
+            with open(marker, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+        except OSError:
+            return None
+        if content.startswith('gitdir:'):
+            git_dir = os.path.join(os.path.dirname(marker), content[7:].strip())
+    
+    signature = []
+    for name in ('HEAD', 'index', os.path.join('logs', 'HEAD')):
+        try:
+            signature.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+@lru_cache(maxsize=64)
+def _load_poetry_name(path: str, mtime_ns: int) -> Optional[str]:
+    # Keyed on mtime so an edited pyproject.toml is parsed again, and only then
+    try:
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+        
+        return data.get('tool', {}).get('poetry', {}).get('name')
+    except Exception:
+        return os.path.basename(os.path.dirname(path))
+
+
+@lru_cache(maxsize=None)
+def _load_pygit2():
+    # Optional (the "git" extra); imported on the first git refresh rather than at startup
+    try:
+        import pygit2
+    except ImportError:
+        return None
+    return pygit2
+
+
+_PACKAGE_HEAD_BYTES = 4096
+_PACKAGE_NAME_RE = re.compile(rb'"name"\s*:\s*"([^"\\]*)"')
+_PACKAGE_VERSION_RE = re.compile(rb'"version"\s*:\s*"([^"\\]*)"')
+
+
+def _read_package_json(path: str) -> Tuple[str, str]:
+    # Only name and version are needed, and they sit at the top of a package.json;
+    # scan that much instead of parsing a manifest that may run to many KB
+    with open(path, 'rb') as f:
+        head = f.read(_PACKAGE_HEAD_BYTES)
+        
+        # Stop at the first nested object/array so an author's or repository's
+        # "name" can't be mistaken for the package's
+        nested = [i for i in (head.find(b'{', head.find(b'{') + 1), head.find(b'[')) if i != -1]
+        top = head[:min(nested)] if nested else head
+        name = _PACKAGE_NAME_RE.search(top)
+        version = _PACKAGE_VERSION_RE.search(top)
+        if name and version:
+            return name.group(1).decode('utf-8'), version.group(1).decode('utf-8')
+        
+        # Fields missing, escaped or further down: parse the whole thing
+        f.seek(0)
+        package_data = json.load(f)
+    
+    return package_data.get('name', 'node-project'), package_data.get('version', '0.0.0')
+
+
+# Whether we run in a container can't change while the process is alive
+_INSIDE_CONTAINER = os.path.exists('/.dockerenv')
+
+
+# How long one listing of the cwd answers the detectors' file checks
+_CWD_SCAN_TTL = 1.0
+
+
+# How long each detector's answer stays fresh. Activating an env or cd-ing clears
+# them all (invalidate_cache), so these only bound drift from outside the shell
+_CACHE_TTLS = {
+    'git_status': 5.0,
+    'python_env': 60.0,
+    'system': 1.0
+}
+
+# Marks a missing cache entry; None is a valid cached answer
+_MISS = object()
+
+
+# Shared by every detector's get_all_environments; threads are only started on first use
+_detector_pool = ThreadPoolExecutor(max_workers=5, thread_name_prefix='env-detect')
 
 
 class EnvironmentDetector:
     def __init__(self):
         self._cache = {}
-        self._cache_timeout = 5 
-        self._last_cache_time = 0
+        self._cache_lock = threading.Lock()
+        # The combined view can't be fresher than its fastest-moving part
+        self._cache_timeout = min(_CACHE_TTLS.values())
+        self._all_env_cache = None
+        self._cwd_entries = None
+        self._all_env_cwd = None
+        self._all_env_time = 0
+        self._git_marker = None
+        self._git_signature = None
+        self._node_signature = None
+        # (inputs, output) of the last prompt/status-bar render, reused while the detector
+        # results are unchanged from one prompt to the next
+        self._indicators_memo = (None, None)
+        self._status_bar_memo = (None, None)
+        # Resolved once rather than by every subprocess spawn; None means no git at all
+        self._git = shutil.which('git')
+        # Last CPU reading and when it was taken; 0.0 means psutil hasn't been sampled yet
+        self._last_cpu = 0.0
+        self._last_cpu_time = 0.0
+    
+    def invalidate_cache(self):
+        self._cache.clear()
+        # source/activate/cd are what trigger this, and they may change PATH
+        self._git = shutil.which('git')
+        self._cwd_entries = None
+        self._all_env_cache = None
     
-    def _should_refresh_cache(self) -> bool:
-        import time
-        return time.time() - self._last_cache_time > self._cache_timeout
+    def _cache_get(self, key: str):
+        # Each entry ages on its own, so refreshing one detector doesn't extend the others
+        entry = self._cache.get(key)
+        if entry is None or time.monotonic() - entry[0] > _CACHE_TTLS[key]:
+            return _MISS
+        return entry[1]
     
-    def _update_cache_time(self):
-        import time
-        self._last_cache_time = time.time()
+    def _scan_cwd(self) -> frozenset:
+        # One directory read answers every "is there a X here" question the detectors ask
+        cwd = os.getcwd()
+        now = time.monotonic()
+        cached = self._cwd_entries
+        if cached is not None and cached[0] == cwd and now - cached[1] < _CWD_SCAN_TTL:
+            return cached[2]
+        
+        try:
+            with os.scandir(cwd) as it:
+                entries = frozenset(entry.name for entry in it)
+        except OSError:
+            entries = frozenset()
+        
+        self._cwd_entries = (cwd, now, entries)
+        return entries
+    
+    def _store(self, key: str, value):
+        # Detectors may run on the pool in get_all_environments
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), value)
     
     def get_python_environment(self) -> Optional[Dict[str, str]]:
-        if not self._should_refresh_cache() and 'python_env' in self._cache:
-            return self._cache['python_env']
+        cached = self._cache_get('python_env')
+        if cached is not _MISS:
+            return cached
         
         env_info = None
         
@@ -68,93 +234,170 @@ class EnvironmentDetector:
                 'display': f"(pipenv:{pipenv_project})"
             }
         
-        self._cache['python_env'] = env_info
-        self._update_cache_time()
+        self._store('python_env', env_info)
         return env_info
     
     def get_git_status(self) -> Optional[Dict[str, str]]:
 
-        if not self._should_refresh_cache() and 'git_status' in self._cache:
-            return self._cache['git_status']
+        cached = self._cache_get('git_status')
+        if cached is not _MISS:
+            # The TTL bounds how stale working-tree edits can look, but a commit,
+            # checkout or add shows up in HEAD/index right away; don't wait it out
+            if _git_signature(self._git_marker) == self._git_signature:
+                return cached
         
-        git_info = None
+        pygit2 = _load_pygit2()
+        self._git_marker = _find_git_marker(os.getcwd()) if self._git or pygit2 else None
         
-        try:
-            subprocess.run(['git', 'rev-parse', '--git-dir'], 
-                         capture_output=True, check=True, timeout=2)
-            
-            branch_result = subprocess.run(['git', 'branch', '--show-current'], 
-                                         capture_output=True, text=True, timeout=2)
-            
-            if branch_result.returncode == 0:
-                branch = branch_result.stdout.strip()
-                if not branch:
-                    commit_result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], 
-                                                 capture_output=True, text=True, timeout=2)
-                    branch = f"HEAD@{commit_result.stdout.strip()}"
-                
-                status_info = self._get_git_status_indicators()
-                
-                git_info = {
-                    'branch': branch,
-                    'display': f"git:{branch}",
-                    **status_info
-                }
+        # Spawning git is the expensive part of a refresh; without git, or outside any
+        # repository (a few stat calls up the tree), there's nothing to ask
+        if self._git_marker is None:
+            self._git_signature = None
+            self._store('git_status', None)
+            return None
         
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
-            pass
+        git_info = _MISS
+        if pygit2 is not None:
+            try:
+                git_info = self._read_libgit2_status(pygit2, os.getcwd())
+            except Exception:
+                # Anything libgit2/pygit2 can't handle (a newer repository format, an
+                # unusual layout, ...); the prompt must not fail over it, so ask git
+                git_info = _MISS
         
-        self._cache['git_status'] = git_info
-        self._update_cache_time()
+        if git_info is _MISS:
+            git_info = self._run_git_status() if self._git else None
+        
+        # Taken after the call: git status may itself refresh the index
+        self._git_signature = _git_signature(self._git_marker)
+        self._store('git_status', git_info)
         return git_info
     
-    def _get_git_status_indicators(self) -> Dict[str, any]:
+    def _run_git_status(self) -> Optional[Dict[str, any]]:
+        git_info = None
         try:
-            status_result = subprocess.run(['git', 'status', '--porcelain'], 
-                                         capture_output=True, text=True, timeout=2)
-            
-            has_changes = bool(status_result.stdout.strip())
-            
-            ahead_behind_result = subprocess.run(['git', 'rev-list', '--left-right', '--count', 'HEAD...@{upstream}'], 
-                                                capture_output=True, text=True, timeout=2)
-            
-            ahead, behind = 0, 0
-            if ahead_behind_result.returncode == 0:
-                parts = ahead_behind_result.stdout.strip().split()
-                if len(parts) == 2:
-                    ahead, behind = int(parts[0]), int(parts[1])
+            # One git call: the --branch headers carry the branch, commit and
+            # ahead/behind counts, and every other line is a changed path
+            proc = subprocess.Popen([self._git, 'status', '--porcelain=v2', '--branch'],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except OSError:
+            proc = None
+        
+        if proc is not None:
+            # Same 2s budget as before; killing git ends the read loop below
+            timer = threading.Timer(2, proc.kill)
+            timer.start()
+            try:
+                git_info = self._parse_git_status(proc.stdout)
+            finally:
+                timer.cancel()
+                # Only the first changed path matters, so a huge dirty tree isn't read to the end
+                if proc.poll() is None:
+                    proc.terminate()
+                proc.stdout.close()
+                proc.wait()
+        
+        return git_info
+    
+    @classmethod
+    def _read_libgit2_status(cls, pygit2, path: str) -> Optional[Dict[str, any]]:
+        # The same answer as `git status --porcelain=v2 --branch`, without a fork+exec
+        repo_path = pygit2.discover_repository(path)
+        if repo_path is None:
+            return None
+        repo = pygit2.Repository(repo_path)
+        
+        ahead, behind = 0, 0
+        if repo.head_is_unborn:
+            branch = repo.lookup_reference('HEAD').target
+            if branch.startswith('refs/heads/'):
+                branch = branch[len('refs/heads/'):]
+        elif repo.head_is_detached:
+            branch = None
+        else:
+            branch = repo.head.shorthand
+            local = repo.branches.local.get(branch)
+            upstream = local.upstream if local is not None else None
+            if upstream is not None:
+                ahead, behind = repo.ahead_behind(repo.head.target, upstream.target)
+        
+        # GIT_STATUS_CURRENT is 0, so any other bit except "ignored" is a change
+        ignored = pygit2.GIT_STATUS_IGNORED
+        has_changes = any(flags & ~ignored for flags in repo.status().values())
+        
+        oid = None if repo.head_is_unborn else str(repo.head.target)
+        return cls._git_info(branch, oid, has_changes, ahead, behind)
+    
+    @classmethod
+    def _parse_git_status(cls, lines) -> Optional[Dict[str, any]]:
+        oid = branch = None
+        ahead, behind = 0, 0
+        has_changes = False
+        seen_header = False
+        
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line.startswith('# '):
+                # Headers come first, so the first entry is all that's left to learn
+                if line:
+                    has_changes = True
+                    break
+                continue
             
-            return {
-                'has_changes': has_changes,
-                'ahead': ahead,
-                'behind': behind,
-                'status_symbol': '●' if has_changes else '○'
-            }
+            seen_header = True
+            key, _, value = line[2:].partition(' ')
+            if key == 'branch.oid':
+                oid = value
+            elif key == 'branch.head':
+                branch = value
+            elif key == 'branch.ab':
+                plus, _, minus = value.partition(' ')
+                ahead, behind = int(plus), -int(minus)
         
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-            return {
-                'has_changes': False,
-                'ahead': 0,
-                'behind': 0,
-                'status_symbol': '○'
-            }
+        # No headers: git failed (not a repository, killed on timeout, ...)
+        if not seen_header:
+            return None
+        
+        return cls._git_info(branch, oid, has_changes, ahead, behind)
+    
+    @staticmethod
+    def _git_info(branch: Optional[str], oid: Optional[str], has_changes: bool,
+                  ahead: int, behind: int) -> Dict[str, any]:
+        if branch is None or branch == '(detached)':
+            branch = f"HEAD@{oid[:7] if oid else ''}"
+        
+        return {
+            'branch': branch,
+            'display': f"git:{branch}",
+            'has_changes': has_changes,
+            'ahead': ahead,
+            'behind': behind,
+            'status_symbol': '●' if has_changes else '○'
+        }
     
     def get_node_environment(self) -> Optional[Dict[str, str]]:
   
-        if not self._should_refresh_cache() and 'node_env' in self._cache:
-            return self._cache['node_env']
+        # No TTL here: everything the answer depends on is visible from a stat, so it
+        # is recomputed exactly when package.json or node_modules changes
+        cwd_entries = self._scan_cwd()
+        has_package = 'package.json' in cwd_entries
+        try:
+            package_mtime = os.stat('package.json').st_mtime_ns if has_package else None
+        except OSError:
+            package_mtime = None
+        signature = (os.getcwd(), package_mtime, 'node_modules' in cwd_entries)
+        
+        cached = self._cache.get('node_env')
+        if cached is not None and signature == self._node_signature:
+            return cached[1]
         
         node_info = None
         
-        if os.path.exists('package.json'):
+        if has_package:
             try:
-                with open('package.json', 'r') as f:
-                    package_data = json.load(f)
+                project_name, version = _read_package_json('package.json')
                 
-                project_name = package_data.get('name', 'node-project')
-                version = package_data.get('version', '0.0.0')
-                
-                has_modules = os.path.exists('node_modules')
+                has_modules = 'node_modules' in cwd_entries
                 
                 node_info = {
                     'type': 'node',
@@ -164,26 +407,29 @@ class EnvironmentDetector:
                     'display': f"node:{project_name}"
                 }
             
-            except (json.JSONDecodeError, OSError):
+            except (ValueError, OSError, AttributeError):
                 pass
         
-        self._cache['node_env'] = node_info
-        self._update_cache_time()
+        self._node_signature = signature
+        self._store('node_env', node_info)
         return node_info
     
     def get_docker_status(self) -> Optional[Dict[str, str]]:
 
         docker_info = None
         
-        if os.path.exists('Dockerfile') or os.path.exists('docker-compose.yml'):
+        cwd_entries = self._scan_cwd()
+        has_dockerfile = 'Dockerfile' in cwd_entries
+        has_compose = 'docker-compose.yml' in cwd_entries
+        if has_dockerfile or has_compose:
             docker_info = {
                 'type': 'docker',
-                'has_dockerfile': os.path.exists('Dockerfile'),
-                'has_compose': os.path.exists('docker-compose.yml'),
+                'has_dockerfile': has_dockerfile,
+                'has_compose': has_compose,
                 'display': 'docker'
             }
         
-        if os.path.exists('/.dockerenv'):
+        if _INSIDE_CONTAINER:
             if docker_info:
                 docker_info['inside_container'] = True
             else:
@@ -197,72 +443,111 @@ class EnvironmentDetector:
     
     def get_system_info(self) -> Dict[str, any]:
 
+        cached = self._cache_get('system')
+        if cached is not _MISS:
+            return cached
+        
         try:
+            # Only the status views need psutil; keep its import off shell startup
+            import psutil
+            
             memory = psutil.virtual_memory()
-            cpu_percent = psutil.cpu_percent(interval=0.1)
+            # Non-blocking: usage since the last reading, instead of sleeping 100ms to sample.
+            # The very first call only primes psutil's counters and reports 0.0 (this runs
+            # on the startup path). Readings closer together than 50ms would be mostly
+            # noise, so reuse the last
+            now = time.monotonic()
+            if not self._last_cpu_time:
+                psutil.cpu_percent(interval=None)
+                self._last_cpu = 0.0
+                self._last_cpu_time = now
+            elif now - self._last_cpu_time >= 0.05:
+                self._last_cpu = psutil.cpu_percent(interval=None)
+                self._last_cpu_time = now
+            cpu_percent = self._last_cpu
             
-            return {
+            system_info = {
                 'memory_percent': memory.percent,
                 'memory_available': memory.available // (1024**2),  # MB
                 'cpu_percent': cpu_percent,
                 'load_average': os.getloadavg()[0] if hasattr(os, 'getloadavg') else 0,
-                'uptime': datetime.now().strftime('%H:%M')
+                'uptime': time.strftime('%H:%M')
             }
         except:
-            return {
+            system_info = {
                 'memory_percent': 0,
                 'memory_available': 0,
                 'cpu_percent': 0,
                 'load_average': 0,
-                'uptime': datetime.now().strftime('%H:%M')
+                'uptime': time.strftime('%H:%M')
             }
+        
+        self._store('system', system_info)
+        return system_info
     
     def _is_poetry_project(self) -> bool:
-        return os.path.exists('pyproject.toml')
+        return 'pyproject.toml' in self._scan_cwd()
     
     def _get_poetry_project_name(self) -> Optional[str]:
+        path = os.path.abspath('pyproject.toml')
         try:
-            import tomli
-            
-            with open('pyproject.toml', 'rb') as f:
-                data = tomli.load(f)
-            
-            return data.get('tool', {}).get('poetry', {}).get('name')
-        except:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
             return os.path.basename(os.getcwd())
+        return _load_poetry_name(path, mtime_ns)
     
     def get_all_environments(self) -> Dict[str, any]:
-
-        return {
-            'python': self.get_python_environment(),
-            'git': self.get_git_status(),
-            'node': self.get_node_environment(),
-            'docker': self.get_docker_status(),
-            'system': self.get_system_info()
+        cwd = os.getcwd()
+        now = time.monotonic()
+        
+        if (self._all_env_cache is not None and 
+            self._all_env_cwd == cwd and 
+            now - self._all_env_time <= self._cache_timeout):
+            return self._all_env_cache
+        
+        # The detectors mostly wait on subprocesses and the filesystem, so run them side by side
+        futures = {
+            'python': _detector_pool.submit(self.get_python_environment),
+            'git': _detector_pool.submit(self.get_git_status),
+            'node': _detector_pool.submit(self.get_node_environment),
+            'docker': _detector_pool.submit(self.get_docker_status),
+            'system': _detector_pool.submit(self.get_system_info)
         }
+        self._all_env_cache = {key: future.result() for key, future in futures.items()}
+        self._all_env_cwd = cwd
+        self._all_env_time = now
+        return self._all_env_cache
     
     def get_prompt_indicators(self) -> List[Tuple[str, str]]:
+        py_env = self.get_python_environment()
+        git_status = self.get_git_status()
+        node_env = self.get_node_environment()
+        docker_status = self.get_docker_status()
+        
+        # Cached detectors hand back the same dicts, so between refreshes this is a few
+        # identity checks instead of rebuilding the strings. Callers only read the list
+        key = (py_env, git_status, node_env, docker_status)
+        if self._indicators_memo[0] == key:
+            return self._indicators_memo[1]
+        
         indicators = []
         
-        py_env = self.get_python_environment()
         if py_env:
             indicators.append(('class:env_python', py_env['display']))
         
-        git_status = self.get_git_status()
         if git_status:
             git_display = f"git:{git_status['branch']}"
             if git_status.get('has_changes'):
                 git_display += "●"
             indicators.append(('class:env_git', git_display))
         
-        node_env = self.get_node_environment()
         if node_env:
             indicators.append(('class:env_node', node_env['display']))
         
-        docker_status = self.get_docker_status()
         if docker_status:
             indicators.append(('class:env_docker', docker_status['display']))
         
+        self._indicators_memo = (key, indicators)
         return indicators
     
     def get_status_bar_info(self) -> str:
@@ -270,6 +555,10 @@ class EnvironmentDetector:
         git = self.get_git_status()
         py_env = self.get_python_environment()
         
+        key = (system, git, py_env)
+        if self._status_bar_memo[0] == key:
+            return self._status_bar_memo[1]
+        
         status_parts = []
         
         if system['cpu_percent'] > 80 or system['memory_percent'] > 85:
@@ -288,7 +577,9 @@ class EnvironmentDetector:
         
         status_parts.append(f"🕒 {system['uptime']}")
         
-        return " │ ".join(status_parts)
+        status = " │ ".join(status_parts)
+        self._status_bar_memo = (key, status)
+        return status
 
 
 env_detector = EnvironmentDetector()
@@ -312,3 +603,7 @@ def get_status_info():
 def get_all_env_info():
     """Get all environment information"""
     return env_detector.get_all_environments()
+
+def invalidate_env_cache():
+    """Drop cached environment info after cd/source/deactivate"""
+    env_detector.invalidate_cache()